@@ -0,0 +1,136 @@
+import bisect
+import functools
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Automaton:
+    """
+    多模式串匹配的 Aho-Corasick 自动机
+
+    添加全部模式串并构建后，一次扫描文本即可找出其中出现的所有模式串，耗时与文本长度线性相关
+    """
+
+    def __init__(self):
+        # 每个状态的转移表、失败指针和匹配输出
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Any]] = [[]]
+
+    def add_word(self, word: str, value: Any) -> None:
+        """
+        添加模式串
+
+        Args:
+            word: 模式串，空串会被忽略
+            value: 匹配到该模式串时输出的值
+        """
+        if not word:
+            return
+
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(value)
+
+    def make_automaton(self) -> None:
+        """按广度优先顺序计算失败指针，并把失败链上的输出合并到各状态"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, Any]]:
+        """
+        扫描文本，依次产出每个匹配
+
+        Args:
+            text: 待扫描的文本
+
+        Returns:
+            Iterator[Tuple[int, Any]]: (匹配结束位置, 模式串的值)
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for value in outputs[state]:
+                yield index, value
+
+
+def build_automaton(words: Iterable[Tuple[str, Any]]) -> Automaton:
+    """由 (模式串, 值) 序列构建自动机"""
+    automaton = Automaton()
+    for word, value in words:
+        automaton.add_word(word, value)
+    automaton.make_automaton()
+    return automaton
+
+
+@functools.lru_cache(maxsize=64)
+def _field_index(fields: Tuple[str, ...]) -> Tuple[Automaton, str, Tuple[int, ...]]:
+    """
+    为一组字段名构建匹配索引，同一张表的数据行字段相同，构建结果可以复用
+
+    Returns:
+        Tuple: (字段名自动机, 小写字段名以NUL拼接的字符串, 各字段在拼接串中的起始位置)
+    """
+    lowered = [field.lower() for field in fields]
+    automaton = build_automaton((field, index) for index, field in enumerate(lowered))
+
+    starts = []
+    offset = 0
+    for field in lowered:
+        starts.append(offset)
+        offset += len(field) + 1
+    return automaton, "\0".join(lowered), tuple(starts)
+
+
+def first_matching_field(name: str, fields: Tuple[str, ...]) -> Optional[int]:
+    """
+    找出第一个与名称互相包含的字段（忽略大小写）：字段名包含名称，或名称包含字段名
+
+    字段名包含名称的情况在拼接串上用一次 find 查找，名称包含字段名的情况用字段名自动机一次扫描名称
+
+    Args:
+        name: 属性名称
+        fields: 按顺序排列的字段名
+
+    Returns:
+        Optional[int]: 第一个匹配字段的下标，没有匹配时返回None
+    """
+    if not fields:
+        return None
+
+    automaton, joined, starts = _field_index(fields)
+    name = name.lower()
+
+    # 名称为空时与每个字段都匹配，和逐个字段判断的结果一致
+    if not name:
+        return 0
+
+    candidates = [index for _, index in automaton.iter(name)]
+
+    if "\0" not in name:
+        position = joined.find(name)
+        if position != -1:
+            # 位置所在的字段即为第一个包含名称的字段
+            candidates.append(bisect.bisect_right(starts, position) - 1)
+
+    return min(candidates) if candidates else None
+
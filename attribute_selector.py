@@ -1,33 +1,214 @@
-import os
+import re
 import sys
 import logging
 import argparse
 import json
 import datetime
-from typing import List, Optional
+import contextvars
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from database import ProductDatabase
 from utils import (
-    call_llm, 
+    cached_llm, 
     analyze_image, 
+    analyze_images,
     find_best_value_match,
+    find_best_value_match_batch,
     get_current_season,
     get_next_season,
     extract_primary_material,
-    clean_attribute_value
+    clean_attribute_value,
+    find_value_containing,
+    validate_image_path,
+    find_existing_paths
 )
-from config import ATTRIBUTE_MATCHING, IMAGE_CONFIG
+from config import ATTRIBUTE_MATCHING, ALIAS_TO_CANONICAL, BATCH_CONFIG, CACHE_CONFIG
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+# 标准属性名称，按配置顺序
+_STANDARD_ATTRS = tuple(ATTRIBUTE_MATCHING.get("aliases", {}))
+_STANDARD_ATTRS_SET = frozenset(_STANDARD_ATTRS)
+_STANDARD_ATTRS_JOINED = ', '.join(_STANDARD_ATTRS)
+
+# 提示词模板：固定说明在前、可变内容在末尾，使同类请求共享完全一致的前缀，便于服务端复用前缀缓存
+_STANDARD_ATTRIBUTE_PROMPT = (
+    "请在给定的标准属性中，找出与目标属性名语义最相似的一项。"
+    "请直接返回最匹配的属性名称，不要有其他内容。\n"
+    "标准属性: {standard_attrs}\n"
+    "目标属性名: {attribute_name}"
+)
+
+_SEASON_MATCH_PROMPT = (
+    "请在给定的选项中，找出与目标值最匹配的一项。"
+    "请直接返回最匹配的选项，不要有其他内容。\n"
+    "目标值: {target}\n"
+    "选项: {options}"
+)
+
+
+# LLM匹配成功的属性名到标准属性名的缓存，超出上限时淘汰最久未使用的项；匹配失败的结果不缓存，下次调用重新匹配
+_MATCHED_STANDARD_ATTRS: "OrderedDict[str, str]" = OrderedDict()
+_MATCHED_STANDARD_ATTRS_MAXSIZE = 4096
+_MATCHED_STANDARD_ATTRS_LOCK = threading.Lock()
+
+
+def _memoised_standard_attribute(attribute_name: str) -> Optional[str]:
+    """返回已缓存的LLM匹配结果，未缓存时返回None，不调用LLM"""
+    with _MATCHED_STANDARD_ATTRS_LOCK:
+        matched = _MATCHED_STANDARD_ATTRS.get(attribute_name)
+        if matched is not None:
+            _MATCHED_STANDARD_ATTRS.move_to_end(attribute_name)
+        return matched
+
+
+def _llm_standard_attribute(attribute_name: str) -> str:
+    """使用LLM将未知属性名匹配到标准属性名，只有匹配成功的结果按属性名缓存，匹配失败时返回原属性名"""
+    matched = _memoised_standard_attribute(attribute_name)
+    if matched is not None:
+        return matched
+    
+    prompt = _STANDARD_ATTRIBUTE_PROMPT.format(
+        standard_attrs=_STANDARD_ATTRS_JOINED,
+        attribute_name=attribute_name
+    )
+    matched = cached_llm(prompt, candidates=_STANDARD_ATTRS)
+    if matched not in _STANDARD_ATTRS_SET:
+        return attribute_name
+    
+    with _MATCHED_STANDARD_ATTRS_LOCK:
+        _MATCHED_STANDARD_ATTRS[attribute_name] = matched
+        _MATCHED_STANDARD_ATTRS.move_to_end(attribute_name)
+        if len(_MATCHED_STANDARD_ATTRS) > _MATCHED_STANDARD_ATTRS_MAXSIZE:
+            _MATCHED_STANDARD_ATTRS.popitem(last=False)
+    return matched
+
+
+# 材质、尺寸属性处理时除属性名本身外还会读取的属性
+_MATERIAL_DATA_ATTRIBUTES = ("材质", "鞋面材质", "帮面材质")
+_SIZE_DATA_ATTRIBUTES = ("后跟高", "靴筒高度", "鞋跟高度", "heel_height", "tube_height", "platform_height")
+
+# 标准化完成前预取产品数据时查询的属性：标准化结果只会是某个标准属性或原属性名，覆盖各处理函数可能读取的全部属性
+_PREFETCH_ATTRIBUTES = frozenset((*_STANDARD_ATTRS, *_MATERIAL_DATA_ATTRIBUTES, *_SIZE_DATA_ATTRIBUTES))
+
+# 标准化与产品数据预取重叠执行时使用的共享线程池，不必每次请求创建线程
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=BATCH_CONFIG["max_workers"], thread_name_prefix="row_prefetch")
+
+
+# 季节属性关键词（基于原始属性名判断）
+_SEASON_KEYWORDS = ("季节", "适用季节", "上市年份季节")
+
+# 属性类别关键词（基于标准属性名判断），顺序即判断优先级
+_ATTRIBUTE_CATEGORIES = {
+    "material": ("材质", "面料", "帮面", "鞋垫材质", "鞋底材质"),
+    "size": ("高度", "厚度", "后跟高", "靴筒高", "鞋跟高", "鞋帮高度"),
+    "closure": ("闭合方式", "鞋扣"),
+    "toe_style": ("鞋头", "鞋尖"),
+    "heel_shape": ("鞋跟",),
+    "opening_depth": ("开口深度", "开口大小"),
+    "style": ("风格", "鞋子风格"),
+    "shoe_shape": ("款式", "鞋子款式"),
+}
+
+# 每个类别单独编译的关键词正则，供各 is_*_attribute 判断使用
+_CATEGORY_PATTERNS = {
+    category: re.compile("|".join(map(re.escape, keywords)))
+    for category, keywords in (("season", _SEASON_KEYWORDS), *_ATTRIBUTE_CATEGORIES.items())
+}
+
+# 每个类别编译为一个前瞻分支，按顺序尝试，一次匹配即可得到优先级最高的类别
+_CATEGORY_RE = re.compile(
+    "(?s)^(?:" + "|".join(
+        f"(?P<{category}>(?=.*?(?:{'|'.join(map(re.escape, keywords))})))"
+        for category, keywords in _ATTRIBUTE_CATEGORIES.items()
+    ) + ")"
+)
+
+# 基于图片分析的属性类别对应的图片分析类型
+_IMAGE_ANALYSIS_TYPES = {
+    "closure": "closure_type",
+    "toe_style": "shoe_toe_style",
+    "heel_shape": "heel_shape",
+    "opening_depth": "opening_depth",
+    "style": "style",
+    "shoe_shape": "shoe_shape",
+}
+
+# 基于图片分析的属性类别在值匹配时使用的属性类型，未列出的类别不使用预定义的值映射
+_IMAGE_VALUE_TYPES = {
+    "closure": "闭合方式",
+}
+
+
+# 批量处理时的中间结果，存放在上下文变量中，同一选择器实例可被并发请求共用
+# 变量的值是选择器实例到该实例数据的字典，多个实例在同一上下文中互不影响
+# 预先合并完成的图片分析结果，键为 (图片路径, 分析类型)
+_IMAGE_ANALYSES = contextvars.ContextVar("image_analyses", default=None)
+# 预先检查过的存在的图片路径
+_EXISTING_IMAGES = contextvars.ContextVar("existing_images", default=None)
+# 预先批量完成的值匹配结果，键为 (查询值, 可用值元组, 属性类型)
+_VALUE_MATCHES = contextvars.ContextVar("value_matches", default=None)
+
+
+def _get_scoped(var: contextvars.ContextVar, owner: Any) -> Any:
+    """读取上下文变量中属于 owner 的值，未设置时返回None"""
+    values = var.get()
+    return None if values is None else values.get(owner)
+
+
+def _set_scoped(var: contextvars.ContextVar, owner: Any, value: Any) -> contextvars.Token:
+    """在当前上下文中设置属于 owner 的值，不影响其他实例的值，返回用于恢复的token"""
+    return var.set({**(var.get() or {}), owner: value})
+
+
+def _batch_item_error(item: Any) -> Optional[str]:
+    """检查批量请求中的一项，字段缺失或类型不对时返回原因，合法时返回None"""
+    if not isinstance(item, dict):
+        return "请求不是JSON对象"
+    if not isinstance(item.get("product_number"), str):
+        return "product_number 缺失或不是字符串"
+    if not isinstance(item.get("attribute_name"), str) or not item["attribute_name"].strip():
+        return "attribute_name 缺失或不是字符串"
+    available_values = item.get("available_values")
+    if not isinstance(available_values, list) or not all(isinstance(value, str) for value in available_values):
+        return "available_values 缺失或不是字符串列表"
+    if not isinstance(item.get("image_path"), (str, type(None))):
+        return "image_path 不是字符串"
+    return None
+
+
+def _batch_item_product_number(item: Any) -> str:
+    """取出批量请求中一项的产品货号，无法取得时返回空字符串"""
+    product_number = item.get("product_number") if isinstance(item, dict) else None
+    return product_number if isinstance(product_number, str) else ""
+
+
 class AttributeSelector:
     """产品属性选择器"""
     
     def __init__(self, db_connection=None):
         self.db = db_connection or ProductDatabase()
+        # 基于图片分析的属性类别及其处理方法
+        self.image_attribute_handlers = {
+            "closure": self.process_closure_attribute,
+            "toe_style": self.process_toe_style_attribute,
+            "heel_shape": self.process_heel_shape_attribute,
+            "opening_depth": self.process_opening_depth_attribute,
+            "style": self.process_style_attribute,
+            "shoe_shape": self.process_shoe_shape_attribute,
+        }
+        # 标准属性名到处理函数的映射，初始化时为配置中的标准属性预先生成
+        self._dispatch = {
+            std_attr: self.build_handler(std_attr)
+            for std_attr in _STANDARD_ATTRS
+        }
         
     def select_attribute_value(self, 
                               product_number: str, 
@@ -46,152 +227,346 @@ class AttributeSelector:
         Returns:
             List[str]: [产品货号, 选择的属性值]
         """
-        logger.info(f"处理产品 {product_number} 的属性: {attribute_name}")
-        logger.info(f"可选属性值: {available_values}")
-        logger.info(f"图片路径: {image_path}")
-        # 检查图片路径和格式
-        if image_path:
-            if not os.path.exists(image_path):
-                logger.warning(f"图片路径不存在: {image_path}")
-                image_path = None
-            else:
-                _, ext = os.path.splitext(image_path)
-                if ext.lower() not in IMAGE_CONFIG["formats"]:
-                    logger.warning(f"不支持的图片格式: {ext}，支持的格式为: {IMAGE_CONFIG['formats']}")
-                    image_path = None
+        logger.info("处理产品 %s 的属性: %s", product_number, attribute_name)
+        logger.info("可选属性值: %s", available_values)
+        logger.info("图片路径: %s", image_path)
+        # 检查图片路径和格式，后续处理只需判断是否为None
+        image_path = validate_image_path(image_path, _get_scoped(_EXISTING_IMAGES, self))
         
         # 清理和规范化属性名称
         attribute_name = attribute_name.strip()
         
-        # 查找对应的标准属性名
-        standard_attribute = self.find_standard_attribute(attribute_name)
-        logger.info(f"标准化属性名称: {standard_attribute}")
+        with self.db.cached_rows():
+            # 查找对应的标准属性名
+            standard_attribute = self.standardize_with_prefetch(product_number, attribute_name)
+            logger.info("标准化属性名称: %s", standard_attribute)
+            
+            selected_value = self.process_attribute(
+                product_number, attribute_name, standard_attribute, available_values, image_path
+            )
         
-        # 根据不同的属性类型选择不同的处理方法
-        selected_value = ""
+        # 如果没有找到匹配的值，使用LLM从可用值列表中选择最合适的
+        if not selected_value and available_values:
+            logger.info("使用通用语义匹配选择属性值")
+            attr_type = standard_attribute if standard_attribute in ATTRIBUTE_MATCHING.get("value_mapping", {}) else None
+            selected_value = find_best_value_match("", available_values, attr_type)
         
-        # 季节相关属性处理
-        if self.is_season_attribute(attribute_name):
-            selected_value = self.process_season_attribute(attribute_name, available_values)
+        # 如果仍然没有找到匹配的值，返回空
+        if not selected_value and available_values:
+            logger.warning("未找到匹配的属性值，返回空")
+            selected_value = ""
         
-        # 材质相关属性处理
-        elif self.is_material_attribute(standard_attribute):
-            selected_value = self.process_material_attribute(product_number, standard_attribute, available_values)
-            logger.info(f"选择的材质: {selected_value}")
+        logger.info("最终选择的属性值: %s", selected_value)
+        logger.debug("*" * 50)
+        return [product_number, selected_value]
+    
+    def standardize_with_prefetch(self, product_number: str, attribute_name: str) -> str:
+        """
+        查找标准化的属性名称；需要调用LLM时，同时在后台预取产品数据，使数据库查询与LLM请求重叠
         
-        # 尺寸相关属性处理
-        elif self.is_size_attribute(standard_attribute):
-            selected_value = self.process_size_attribute(product_number, standard_attribute, available_values, image_path)
+        Args:
+            product_number: 产品货号
+            attribute_name: 属性名称
+            
+        Returns:
+            str: 标准化的属性名称
+        """
+        if attribute_name in ALIAS_TO_CANONICAL:
+            return ALIAS_TO_CANONICAL[attribute_name]
+        
+        # 季节属性和基于图片分析的属性不需要数据库数据，不做预取
+        category_hint = self.classify_attribute(attribute_name, attribute_name)
+        if category_hint == "season" or category_hint in self.image_attribute_handlers:
+            return self.find_standard_attribute(attribute_name)
+        
+        # 已缓存的匹配结果无需调用LLM，没有可以重叠的等待时间
+        matched = _memoised_standard_attribute(attribute_name)
+        if matched is not None:
+            return matched
+        
+        # 在当前上下文的副本中执行，预取结果写入本次请求的行缓存
+        prefetch = _PREFETCH_EXECUTOR.submit(
+            contextvars.copy_context().run, 
+            self.db.prefetch_product_rows, product_number, _PREFETCH_ATTRIBUTES | {attribute_name}
+        )
+        standard_attribute = self.find_standard_attribute(attribute_name)
+        # 等待预取完成后再继续，后续查询直接命中缓存
+        prefetch.result()
         
-        # 闭合方式属性处理
-        elif self.is_closure_attribute(standard_attribute):
-            selected_value = self.process_closure_attribute(image_path, available_values)
+        return standard_attribute
+    
+    def process_attribute(self, 
+                          product_number: str, 
+                          attribute_name: str, 
+                          standard_attribute: str, 
+                          available_values: List[str], 
+                          image_path: Optional[str] = None) -> str:
+        """
+        根据属性类别选择对应的处理方法
+        
+        Args:
+            product_number: 产品货号
+            attribute_name: 原始属性名称
+            standard_attribute: 标准化的属性名称
+            available_values: 可用的属性值列表
+            image_path: 产品图片路径
+            
+        Returns:
+            str: 选择的属性值，未找到时返回空字符串
+        """
+        # 季节相关属性按原始属性名判断
+        if self.is_season_attribute(attribute_name):
+            return self.process_season_attribute(attribute_name, available_values)
         
-        # 鞋头款式属性处理
-        elif self.is_toe_style_attribute(standard_attribute):
-            selected_value = self.process_toe_style_attribute(image_path, available_values)
+        # 映射表只保存配置中的标准属性；标准化失败时原样传入的属性名各不相同，临时生成处理函数，不写入映射表以免无限增长
+        handler = self._dispatch.get(standard_attribute)
+        if handler is None:
+            handler = self.build_handler(standard_attribute)
+        return handler(product_number, available_values, image_path)
+    
+    def build_handler(self, standard_attribute: str) -> Callable[[str, List[str], Optional[str]], str]:
+        """
+        为标准属性生成处理函数，类别在生成时确定，调用时不再逐项判断
         
-        # 鞋跟款式属性处理
-        elif self.is_heel_shape_attribute(standard_attribute):
-            selected_value = self.process_heel_shape_attribute(image_path, available_values)
+        Args:
+            standard_attribute: 标准化的属性名称
+            
+        Returns:
+            Callable: 接收 (产品货号, 可用的属性值列表, 产品图片路径) 并返回选择的属性值的函数
+        """
+        match = _CATEGORY_RE.match(standard_attribute)
+        category = match.lastgroup if match else "general"
         
-        # 开口深度属性处理
-        elif self.is_opening_depth_attribute(standard_attribute):
-            selected_value = self.process_opening_depth_attribute(image_path, available_values)
+        # 材质相关属性处理
+        if category == "material":
+            def handler(product_number, available_values, image_path):
+                selected_value = self.process_material_attribute(product_number, standard_attribute, available_values)
+                logger.info("选择的材质: %s", selected_value)
+                return selected_value
+            return handler
         
-        # 风格属性处理
-        elif self.is_style_attribute(standard_attribute):
-            selected_value = self.process_style_attribute(image_path, available_values)
+        # 尺寸相关属性处理
+        if category == "size":
+            return lambda product_number, available_values, image_path: self.process_size_attribute(
+                product_number, standard_attribute, available_values, image_path
+            )
         
-        # 鞋款属性处理
-        elif self.is_shoe_shape_attribute(standard_attribute):
-            selected_value = self.process_shoe_shape_attribute(image_path, available_values)
+        # 闭合方式、鞋头款式、鞋跟款式、开口深度、风格、鞋款等基于图片分析的属性处理
+        if category in self.image_attribute_handlers:
+            image_handler = self.image_attribute_handlers[category]
+            return lambda product_number, available_values, image_path: image_handler(image_path, available_values)
         
         # 其他属性的通用处理
-        else:
-            selected_value = self.process_general_attribute(product_number, standard_attribute, available_values)
+        return lambda product_number, available_values, image_path: self.process_general_attribute(
+            product_number, standard_attribute, available_values
+        )
+    
+    def select_attribute_values(self, items: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        批量为产品选择属性值
         
-        # 如果没有找到匹配的值，使用LLM从可用值列表中选择最合适的
-        if not selected_value and available_values:
-            logger.info("使用通用语义匹配选择属性值")
-            attr_type = standard_attribute if standard_attribute in ATTRIBUTE_MATCHING.get("value_mapping", {}) else None
-            selected_value = find_best_value_match("", available_values, attr_type)
+        Args:
+            items: 请求列表，每项包含 product_number、attribute_name、available_values，可选 image_path；
+                非法的项（例如无法解析的行传入 None）得到 [产品货号, ""]，不影响其他请求
+            
+        Returns:
+            List[List[str]]: 与输入顺序一致的 [产品货号, 选择的属性值] 列表
+        """
+        # 先逐项检查，后续的批量预处理只处理合法的请求
+        valid_flags = []
+        for item in items:
+            error = _batch_item_error(item)
+            if error is not None:
+                logger.error("跳过非法的批量请求 %s: %s", _batch_item_product_number(item), error)
+            valid_flags.append(error is None)
+        valid_items = [item for item, valid in zip(items, valid_flags) if valid]
+        
+        # 并发完成未知属性名的标准化，使多个LLM请求同时在途，结果写入缓存供后续复用
+        unknown_names = {item["attribute_name"].strip() for item in valid_items} - ALIAS_TO_CANONICAL.keys()
+        if unknown_names:
+            max_workers = min(len(unknown_names), BATCH_CONFIG["max_workers"])
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(self.find_standard_attribute, unknown_names))
+        
+        # 同一图片的多项分析合并为一次视觉模型请求
+        # 每个上下文变量设置后立即登记恢复，后续预处理步骤出错时已设置的值也会被恢复
+        with ExitStack() as scopes:
+            # 所有图片按目录一次性检查是否存在
+            existing_images = find_existing_paths(item.get("image_path") for item in valid_items)
+            scopes.callback(_EXISTING_IMAGES.reset, _set_scoped(_EXISTING_IMAGES, self, existing_images))
+            image_requests = self.image_analysis_requests(valid_items)
+            image_analyses = self.prefetch_image_analyses(image_requests)
+            scopes.callback(_IMAGE_ANALYSES.reset, _set_scoped(_IMAGE_ANALYSES, self, image_analyses))
+            # 图片分析结果与可用值的匹配批量完成，需要嵌入匹配的查询值一次编码
+            value_matches = self.prefetch_value_matches(image_requests, image_analyses)
+            scopes.callback(_VALUE_MATCHES.reset, _set_scoped(_VALUE_MATCHES, self, value_matches))
+            
+            # 同一产品的多个属性共用一次数据库查询结果，所有产品的数据行一次批量取回
+            with self.db.cached_rows():
+                self.db.prefetch_products_rows([item["product_number"] for item in valid_items])
+                return [
+                    self.select_batch_item(item) if valid else [_batch_item_product_number(item), ""]
+                    for item, valid in zip(items, valid_flags)
+                ]
+    
+    def select_batch_item(self, item: Dict[str, Any]) -> List[str]:
+        """为批量请求中的一项选择属性值，处理失败时记录错误并返回空值，不影响其他请求"""
+        try:
+            return self.select_attribute_value(
+                item["product_number"],
+                item["attribute_name"],
+                item["available_values"],
+                item.get("image_path")
+            )
+        except Exception as e:
+            logger.error("处理产品 %s 的属性 %s 失败: %s", item.get("product_number"), item.get("attribute_name"), e)
+            return [item.get("product_number", ""), ""]
+    
+    def image_analysis_requests(self, items: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str, str]]:
+        """
+        找出批量请求中基于图片分析、且图片存在的请求
         
-        # 如果仍然没有找到匹配的值，返回空
-        if not selected_value and available_values:
-            logger.warning(f"未找到匹配的属性值，返回空")
-            selected_value = ""
+        Args:
+            items: 请求列表
+            
+        Returns:
+            List[Tuple[Dict[str, Any], str, str]]: (请求, 图片路径, 属性类别) 列表
+        """
+        existing_images = _get_scoped(_EXISTING_IMAGES, self)
+        image_requests = []
+        for item in items:
+            image_path = item.get("image_path")
+            # 不存在的图片在后续单项处理时记录警告，这里直接跳过
+            if not image_path or (existing_images is not None and image_path not in existing_images):
+                continue
+            attribute_name = item["attribute_name"].strip()
+            category = self.classify_attribute(attribute_name, self.find_standard_attribute(attribute_name))
+            if category in _IMAGE_ANALYSIS_TYPES:
+                image_requests.append((item, image_path, category))
+        return image_requests
+    
+    def prefetch_image_analyses(self, image_requests: List[Tuple[Dict[str, Any], str, str]]) -> Dict[Tuple[str, str], str]:
+        """
+        按图片汇总需要的图片分析类型并发完成分析，同一图片需要多项分析时合并为一次请求
         
-        logger.info(f"最终选择的属性值: {selected_value}")
-        print("*"*50)
-        return [product_number, selected_value]
+        Args:
+            image_requests: image_analysis_requests 返回的请求列表
+            
+        Returns:
+            Dict[Tuple[str, str], str]: (图片路径, 分析类型) 到分析结果的字典
+        """
+        types_by_image = {}
+        for _, image_path, category in image_requests:
+            types_by_image.setdefault(image_path, set()).add(_IMAGE_ANALYSIS_TYPES[category])
+        
+        return analyze_images(
+            {image_path: sorted(analysis_types) for image_path, analysis_types in types_by_image.items()},
+            _get_scoped(_EXISTING_IMAGES, self)
+        )
+    
+    def prefetch_value_matches(self, 
+                               image_requests: List[Tuple[Dict[str, Any], str, str]], 
+                               image_analyses: Dict[Tuple[str, str], str]) -> Dict[Tuple[str, Tuple[str, ...], Optional[str]], str]:
+        """
+        用 find_best_value_match_batch 一次完成图片分析结果与可用值的匹配
+        
+        Args:
+            image_requests: image_analysis_requests 返回的请求列表
+            image_analyses: prefetch_image_analyses 返回的分析结果
+            
+        Returns:
+            Dict: (查询值, 可用值元组, 属性类型) 到匹配结果的字典
+        """
+        keys = {}
+        for item, image_path, category in image_requests:
+            query_value = image_analyses.get((image_path, _IMAGE_ANALYSIS_TYPES[category]))
+            # 分析失败的请求在处理时直接返回空值，不需要匹配
+            if query_value:
+                keys[(query_value, tuple(item["available_values"]), _IMAGE_VALUE_TYPES.get(category))] = None
+        
+        if not keys:
+            return {}
+        try:
+            matched = find_best_value_match_batch([(query, list(values), attr_type) for query, values, attr_type in keys])
+        except Exception as e:
+            # 批量匹配失败时各请求在处理时逐项匹配
+            logger.error("批量值匹配失败: %s", e)
+            return {}
+        return dict(zip(keys, matched))
+    
+    def match_value(self, query_value: str, available_values: List[str], attribute_type: str = None) -> str:
+        """在可用值中找到与查询值最匹配的选项，优先使用批量处理时预先完成的匹配结果"""
+        value_matches = _get_scoped(_VALUE_MATCHES, self)
+        if value_matches:
+            key = (query_value, tuple(available_values), attribute_type)
+            if key in value_matches:
+                return value_matches[key]
+        return find_best_value_match(query_value, available_values, attribute_type)
+    
+    def analyze_image(self, image_path: str, analysis_type: str) -> str:
+        """分析图片，优先使用批量处理时预先合并完成的分析结果"""
+        image_analyses = _get_scoped(_IMAGE_ANALYSES, self)
+        if image_analyses and (image_path, analysis_type) in image_analyses:
+            return image_analyses[(image_path, analysis_type)]
+        return analyze_image(image_path, analysis_type, _get_scoped(_EXISTING_IMAGES, self))
     
     def find_standard_attribute(self, attribute_name: str) -> str:
         """查找标准化的属性名称"""
-        # 直接匹配别名
-        aliases = ATTRIBUTE_MATCHING.get("aliases", {})
-        for std_attr, alias_list in aliases.items():
-            if attribute_name == std_attr or attribute_name in alias_list:
-                return std_attr
-        
-        # 使用LLM进行语义匹配
-        standard_attrs = list(aliases.keys())
-        prompt = f"""
-        在以下属性中，找出与"{attribute_name}"语义最相似的一项:
-        {', '.join(standard_attrs)}
-        
-        请直接返回最匹配的属性名称，不要有其他内容。
+        # 直接匹配别名，未命中时使用LLM进行语义匹配
+        return ALIAS_TO_CANONICAL.get(attribute_name) or _llm_standard_attribute(attribute_name)
+    
+    def classify_attribute(self, attribute_name: str, standard_attribute: str) -> str:
         """
-        matched = call_llm(prompt)
-        if matched in standard_attrs:
-            return matched
+        判断属性所属的处理类别
         
-        return attribute_name
+        Args:
+            attribute_name: 原始属性名称
+            standard_attribute: 标准化后的属性名称
+            
+        Returns:
+            str: 属性类别，未命中任何类别时返回 "general"
+        """
+        if self.is_season_attribute(attribute_name):
+            return "season"
+        
+        match = _CATEGORY_RE.match(standard_attribute)
+        return match.lastgroup if match else "general"
     
     def is_season_attribute(self, attribute_name: str) -> bool:
         """判断是否为季节相关属性"""
-        season_keywords = ["季节", "适用季节", "上市年份季节"]
-        return any(keyword in attribute_name for keyword in season_keywords)
+        return bool(_CATEGORY_PATTERNS["season"].search(attribute_name))
     
     def is_material_attribute(self, attribute_name: str) -> bool:
         """判断是否为材质相关属性"""
-        material_keywords = ["材质", "面料", "帮面","鞋垫材质", "鞋底材质"]
-        return any(keyword in attribute_name for keyword in material_keywords)
+        return bool(_CATEGORY_PATTERNS["material"].search(attribute_name))
     
     def is_size_attribute(self, attribute_name: str) -> bool:
         """判断是否为尺寸相关属性"""
-        size_keywords = ["高度", "厚度", "后跟高", "靴筒高", "鞋跟高", "鞋帮高度"]
-        return any(keyword in attribute_name for keyword in size_keywords)
+        return bool(_CATEGORY_PATTERNS["size"].search(attribute_name))
     
     def is_closure_attribute(self, attribute_name: str) -> bool:
         """判断是否为闭合方式属性"""
-        closure_keywords = ["闭合方式", "鞋扣"]
-        return any(keyword in attribute_name for keyword in closure_keywords)
+        return bool(_CATEGORY_PATTERNS["closure"].search(attribute_name))
     
     def is_toe_style_attribute(self, attribute_name: str) -> bool:
         """判断是否为鞋头款式属性"""
-        toe_keywords = ["鞋头", "鞋尖"]
-        return any(keyword in attribute_name for keyword in toe_keywords)
+        return bool(_CATEGORY_PATTERNS["toe_style"].search(attribute_name))
     
     def is_heel_shape_attribute(self, attribute_name: str) -> bool:
         """判断是否为鞋跟款式属性"""
-        heel_keywords = ["鞋跟"]
-        return any(keyword in attribute_name for keyword in heel_keywords)
+        return bool(_CATEGORY_PATTERNS["heel_shape"].search(attribute_name))
     
     def is_opening_depth_attribute(self, attribute_name: str) -> bool:
         """判断是否为开口深度属性"""
-        opening_depth_keywords = ["开口深度", "开口大小"]
-        return any(keyword in attribute_name for keyword in opening_depth_keywords)
+        return bool(_CATEGORY_PATTERNS["opening_depth"].search(attribute_name))
     
     def is_style_attribute(self, attribute_name: str) -> bool:
         """判断是否为风格属性"""
-        style_keywords = ["风格", "鞋子风格"]
-        return any(keyword in attribute_name for keyword in style_keywords)  
+        return bool(_CATEGORY_PATTERNS["style"].search(attribute_name))
     
     def is_shoe_shape_attribute(self, attribute_name: str) -> bool:
         """判断是否为款式属性"""
-        shoe_shape_keywords = ["款式", "鞋子款式"]
-        return any(keyword in attribute_name for keyword in shoe_shape_keywords)
+        return bool(_CATEGORY_PATTERNS["shoe_shape"].search(attribute_name))
     
     def process_season_attribute(self, attribute_name: str, available_values: List[str]) -> str:
         """处理季节相关属性"""
@@ -202,31 +577,26 @@ class AttributeSelector:
             # 寻找包含当前年份和当前季节的选项
             year_season = f"{current_year}{current_season}"
             
-            for value in available_values:
-                if current_year in value and current_season in value:
-                    return value
+            matched = find_value_containing(available_values, [current_year, current_season])
+            if matched is not None:
+                return matched
             
             # 如果没有找到精确匹配，使用LLM选择最接近的
-            prompt = f"""
-            在以下选项中，找出与"{year_season}"最匹配的一项:
-            {', '.join(available_values)}
-            
-            请直接返回最匹配的选项，不要有其他内容。
-            """
-            return call_llm(prompt)
+            prompt = _SEASON_MATCH_PROMPT.format(target=year_season, options=', '.join(available_values))
+            return cached_llm(prompt, ttl=CACHE_CONFIG["season_ttl"], candidates=available_values)
         else:
             next_season = get_next_season()
             
-            for value in available_values:
-                if next_season in value:
-                    return value
+            matched = find_value_containing(available_values, [next_season])
+            if matched is not None:
+                return matched
             
             return find_best_value_match(next_season, available_values)
     
     def process_material_attribute(self, product_number: str, attribute_name: str, available_values: List[str]) -> str:
         """处理材质相关属性"""
         # 从数据库获取产品材质信息
-        product_data = self.db.get_product_data(product_number, ["材质", "鞋面材质", "帮面材质", attribute_name])
+        product_data = self.db.get_product_data(product_number, [*_MATERIAL_DATA_ATTRIBUTES, attribute_name])
         material = ""
         if attribute_name in product_data:
             material = product_data[attribute_name]
@@ -242,7 +612,7 @@ class AttributeSelector:
             material = product_data["内里材质"]
         elif "材质" in product_data:
             material = product_data["材质"]
-        logger.info(f"材质相关属性处理结果: {material}")
+        logger.info("材质相关属性处理结果: %s", material)
         if material:
             # 提取主要材质（如果有多种材质）
             primary_material = extract_primary_material(material)
@@ -253,10 +623,7 @@ class AttributeSelector:
     def process_size_attribute(self, product_number: str, attribute_name: str, available_values: List[str], image_path: Optional[str] = None) -> str:
         """处理尺寸相关属性"""
         # 从数据库获取产品尺寸信息
-        size_attributes = [
-            attribute_name, "后跟高", "靴筒高度", "鞋跟高度",
-            "heel_height", "tube_height", "platform_height"
-        ]
+        size_attributes = [attribute_name, *_SIZE_DATA_ATTRIBUTES]
         product_data = self.db.get_product_data(product_number, size_attributes)
         
         size_value = ""
@@ -280,7 +647,7 @@ class AttributeSelector:
                     if field in product_data:
                         size_value = product_data[field]
                         break
-        logger.info(f"尺寸相关属性处理结果: {product_data}:{size_value}")
+        logger.info("尺寸相关属性处理结果: %s:%s", product_data, size_value)
         # 如果数据库中没有找到尺寸数据,尝试使用图像识别
         if size_value == None:
             logger.info("数据库中未找到尺寸数据,尝试使用图像识别")
@@ -295,8 +662,8 @@ class AttributeSelector:
                 recognition_type = "platform_height"
                 
             if recognition_type:
-                size_value = analyze_image(image_path, "heel_height")
-                logger.info(f"图像识别获取到的尺寸值: {size_value}")
+                size_value = self.analyze_image(image_path, "heel_height")
+                logger.info("图像识别获取到的尺寸值: %s", size_value)
         
         if size_value:
             # 清理尺寸值，确保格式正确
@@ -309,83 +676,83 @@ class AttributeSelector:
     
     def process_closure_attribute(self, image_path: str, available_values: List[str]) -> str:
         """处理闭合方式属性"""
-        if not image_path or not os.path.exists(image_path):
+        if image_path is None:
             logger.warning("缺少图片，无法分析闭合方式")
             return ""
         
         # 使用图像分析获取闭合方式
-        closure_type = analyze_image(image_path, "closure_type")
+        closure_type = self.analyze_image(image_path, "closure_type")
         if closure_type:
             # 在可用值中找到最匹配的
-            return find_best_value_match(closure_type, available_values, "闭合方式")
+            return self.match_value(closure_type, available_values, "闭合方式")
         
         return ""
     
     def process_toe_style_attribute(self, image_path: str, available_values: List[str]) -> str:
         """处理鞋头款式属性"""
-        if not image_path or not os.path.exists(image_path):
+        if image_path is None:
             logger.warning("缺少图片，无法分析鞋头款式")
             return ""
         
         # 使用图像分析获取鞋头款式
-        toe_style = analyze_image(image_path, "shoe_toe_style")
+        toe_style = self.analyze_image(image_path, "shoe_toe_style")
         if toe_style:
             # 在可用值中找到最匹配的
-            return find_best_value_match(toe_style, available_values)
+            return self.match_value(toe_style, available_values)
         
         return ""
     
     def process_heel_shape_attribute(self, image_path: str, available_values: List[str]) -> str:
         """处理鞋跟款式属性"""
-        if not image_path or not os.path.exists(image_path):
+        if image_path is None:
             logger.warning("缺少图片，无法分析鞋跟款式")
             return ""
         
         # 使用图像分析获取鞋跟款式
-        heel_shape = analyze_image(image_path, "heel_shape")
+        heel_shape = self.analyze_image(image_path, "heel_shape")
         if heel_shape:
             # 在可用值中找到最匹配的
-            return find_best_value_match(heel_shape, available_values)
+            return self.match_value(heel_shape, available_values)
         
         return ""
     
     def process_opening_depth_attribute(self, image_path: str, available_values: List[str]) -> str:
         """处理开口深度属性"""
-        if not image_path or not os.path.exists(image_path):
+        if image_path is None:
             logger.warning("缺少图片，无法分析开口深度")
             return ""
         
         # 使用图像分析获取开口深度
-        opening_depth = analyze_image(image_path, "opening_depth")
+        opening_depth = self.analyze_image(image_path, "opening_depth")
         if opening_depth:
             # 在可用值中找到最匹配的
-            return find_best_value_match(opening_depth, available_values)
+            return self.match_value(opening_depth, available_values)
         
         return ""
     
     def process_style_attribute(self, image_path: str, available_values: List[str]) -> str:
         """处理风格属性"""
-        if not image_path or not os.path.exists(image_path):
-            logger.waring("缺少图片，无法分析风格")
+        if image_path is None:
+            logger.warning("缺少图片，无法分析风格")
             return ""
         
         # 使用图像分析获取风格
-        style = analyze_image(image_path, "style")
+        style = self.analyze_image(image_path, "style")
         if style:
-            return find_best_value_match(style, available_values)
+            return self.match_value(style, available_values)
         return ""
     
     def process_shoe_shape_attribute(self, image_path: str, available_values: List[str]) -> str:
         """处理鞋款属性"""
-        if not image_path or not os.path.exists(image_path):
-            logger.waring("缺少图片，无法分析款式")
+        if image_path is None:
+            logger.warning("缺少图片，无法分析款式")
             return ""
         
         # 使用图像分析获取鞋款
-        shoe_shape = analyze_image(image_path, "shoe_shape")
+        shoe_shape = self.analyze_image(image_path, "shoe_shape")
         if shoe_shape:
-            logger.info(f"图像分析获取到的款式: {shoe_shape}")
-            return find_best_value_match(shoe_shape, available_values)
+            logger.info("图像分析获取到的款式: %s", shoe_shape)
+            return self.match_value(shoe_shape, available_values)
         return ""
     
 
@@ -401,16 +768,63 @@ class AttributeSelector:
         return ""
 
 
+def _parse_batch_line(line: str) -> Any:
+    """解析批量请求文件中的一行，无法解析时记录错误并返回None，由 select_attribute_values 输出空结果"""
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        logger.error("无法解析的批量请求行: %s", e)
+        return None
+
+
+def run_batch(batch_file: str) -> None:
+    """
+    在同一进程内批量处理请求，模型、数据库连接和各级缓存只初始化一次
+    
+    Args:
+        batch_file: 请求文件路径，每行一个JSON对象，"-" 表示从标准输入读取
+    """
+    if batch_file == "-":
+        items = [_parse_batch_line(line) for line in sys.stdin if line.strip()]
+    else:
+        with open(batch_file, encoding="utf-8") as f:
+            items = [_parse_batch_line(line) for line in f if line.strip()]
+    
+    selector = AttributeSelector()
+    try:
+        for result in selector.select_attribute_values(items):
+            print(json.dumps(result, ensure_ascii=False))
+    finally:
+        selector.db.close()
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="产品属性选择系统")
-    parser.add_argument("product_number", help="产品货号")
-    parser.add_argument("attribute_name", help="属性名称")
-    parser.add_argument("available_values", help="可用属性值列表，JSON格式")
-    parser.add_argument("image", help="产品图片路径")
+    parser.add_argument("product_number", nargs="?", help="产品货号")
+    parser.add_argument("attribute_name", nargs="?", help="属性名称")
+    parser.add_argument("available_values", nargs="?", help="可用属性值列表，JSON格式")
+    parser.add_argument("image", nargs="?", help="产品图片路径")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="批量请求文件，每行一个包含 product_number、attribute_name、available_values、image_path 的JSON对象，"
+             "\"-\" 表示从标准输入读取；批量处理时逐行输出结果"
+    )
     
     args = parser.parse_args()
     
+    if args.batch:
+        try:
+            run_batch(args.batch)
+        except Exception as e:
+            logger.error("批量处理过程中出错: %s", e)
+            sys.exit(1)
+        return
+    
+    if args.image is None:
+        parser.error("未使用 --batch 时需要提供 product_number、attribute_name、available_values 和 image")
+    
     try:
         # 解析可用属性值列表
         available_values = json.loads(args.available_values)
@@ -432,7 +846,7 @@ def main():
         print(json.dumps(result, ensure_ascii=False))
         
     except Exception as e:
-        logger.error(f"处理过程中出错: {e}")
+        logger.error("处理过程中出错: %s", e)
         print(json.dumps([args.product_number, ""], ensure_ascii=False))
         sys.exit(1)
 
@@ -1,4 +1,6 @@
 import os
+import json
+from types import MappingProxyType
 
 # 项目根目录
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -6,34 +8,87 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # 数据库配置
 DB_CONFIG = {
     "mysql": {
-        "host": "localhost",
-        "port": 3306,
-        "user": "",
-        "password": "",
-        "database": "",
-        "charset": "utf8mb4"
-    }
+        # 连接信息可通过环境变量覆盖，避免把凭据写入代码
+        "host": os.environ.get("DB_HOST", "localhost"),
+        "port": int(os.environ.get("DB_PORT", 3306)),
+        "user": os.environ.get("DB_USER", ""),
+        "password": os.environ.get("DB_PASSWORD", ""),
+        "database": os.environ.get("DB_NAME", ""),
+        "charset": "utf8mb4",
+        # 只读查询也会开启事务，不自动提交时长期复用的池化连接会一直读取首次查询时的快照
+        "autocommit": True
+    },
+    # 连接池配置；归还连接时重置会话，不把会话状态带给下一个使用者
+    "pool": {
+        "pool_name": "product_attribute",
+        "pool_size": 8,
+        "pool_reset_session": True
+    },
+    # 连接全部被占用时等待空闲连接的最长时间（秒）
+    "pool_timeout": 30,
+    # 查询属性可选值时最多返回的不同值数量
+    "distinct_values_limit": 10000,
+    # 流式读取大结果集时每批读取的行数
+    "fetch_size": 1000
 }
 
 # API配置
 OPENAI_CONFIG = {
-    "api_key": "your_api_key",
+    "api_key": os.environ.get("OPENAI_API_KEY", "your_api_key"),
     "default_model": "glm-4v-flash",  
     "vision_model": "glm-4v-flash",  
     "base_url": "https://open.bigmodel.cn/api/paas/v4", 
+    # 同步请求的连接池配置，重试配置同步和异步请求共用
+    "pool_connections": 32,
+    "pool_maxsize": 64,
+    "max_retries": 5,
+    "backoff_factor": 0.5,
+    # 异步并发请求的连接池配置
+    "max_connections": 64,
+    "max_keepalive_connections": 32,
+    "timeout": 60,
 }
 
 # 老张API配置
 LAOZHANG_CONFIG = {
-    "api_key": "your_api_key",
+    "api_key": os.environ.get("LAOZHANG_API_KEY", "your_api_key"),
     "default_model": "deepseek-chat",    
     "base_url": "https://api.laozhang.ai/v1",
 }
 
 # 火山引擎配置
 VOLCENGINE_CONFIG = {
-    "api_key": "your_api_key",
+    "api_key": os.environ.get("VOLCENGINE_API_KEY", "your_api_key"),
     "default_model": "deepseek-r1-250120",    
+    "stream_max_tokens": 16,  # 流式短答案的最大输出token数
+    "stream_stop": ["\n", "。"],  # 流式短答案的停止序列，不含逗号，候选值本身可能包含逗号
+}
+
+# 批量处理配置
+BATCH_CONFIG = {
+    "max_workers": 8,  # 并发LLM请求的最大线程数
+}
+
+# LLM响应缓存配置
+CACHE_CONFIG = {
+    "path": os.path.join(BASE_DIR, ".llm_cache", "llm_cache.sqlite3"),
+    "season_ttl": 24 * 60 * 60,  # 季节相关结果随日期变化，缓存一天
+    "attribute_values_ttl": 60 * 60,  # 属性可选值变化缓慢，过期后先返回旧值并在后台刷新
+    "attribute_values_maxsize": 512,
+    "llm_response_ttl": 24 * 60 * 60,  # 相同请求的模型响应缓存一天
+}
+
+# 服务配置，uvloop 和 httptools 由 uvicorn[standard] 提供
+# 每个 worker 是独立进程，各自在 lifespan 中创建选择器实例：
+# 每个 worker 占用 pool_size 个 MySQL 连接并单独加载一份 embedding 模型，
+# 因此默认只开 2 个，调大时需保证 workers * pool_size 小于 MySQL 的 max_connections
+SERVER_CONFIG = {
+    "host": "0.0.0.0",
+    "port": 14736,
+    "workers": int(os.environ.get("SERVER_WORKERS", 2)),
+    "loop": "uvloop",
+    "http": "httptools",
+    "log_level": "info",
 }
 
 # 日志配置
@@ -45,12 +100,26 @@ LOG_CONFIG = {
 
 # 图像处理配置
 IMAGE_CONFIG = {
-    "max_size": (512, 512), 
+    "max_size": (512, 512),  # 上传给视觉模型前把图片缩小到该尺寸以内
+    "jpeg_quality": 80,  # 缩小后重新编码的JPEG质量
     "formats": [".jpg", ".jpeg", ".png", ".webp"],  
+    "max_tokens": 64,  # 单项图片分析的最大输出token数，回答只是一个短词
+    "multi_max_tokens": 256,  # 合并多项图片分析时的最大输出token数
+    "concurrency": 8,  # 批量图片分析时同时进行的请求数
+    "encode_cache_size": 64,  # 进程内缓存的已编码图片数
+}
+
+# 文本嵌入模型配置
+EMBEDDING_CONFIG = {
+    "model_name": "paraphrase-multilingual-MiniLM-L12-v2",
+    "quantize": True,  # 在CPU上运行时把线性层动态量化为int8
+    "num_threads": int(os.environ.get("EMBEDDING_NUM_THREADS", 0)) or None,  # 每个进程的推理线程数，None 使用torch默认值
 }
 
 # 属性匹配配置
 ATTRIBUTE_MATCHING = {
+    # 查询值与最相似可选值的嵌入相似度不低于该阈值时直接采用，不再调用LLM
+    "embedding_match_threshold": 0.80,
     "aliases": {
         "鞋面材质": ["帮面材质", "靴筒面材质", "鞋帮材质"],
         "鞋底材质": ["鞋底材质", "鞋底材料", "鞋底材料类型"],
@@ -88,4 +157,75 @@ ATTRIBUTE_MATCHING = {
             "平跟(小于1cm)": ["0cm", "0.5cm", "1cm以下", "平跟"],
         },
     },
-} 
\ No newline at end of file
+} 
+
+
+
+def _merge_attribute_matching(base: dict, overlay: dict) -> dict:
+    """
+    把补充配置合并到属性匹配配置：aliases 按标准属性合并别名，value_mapping 按属性类型和标准值合并别名
+    
+    已有的别名保持原顺序，新增的别名追加在后面；补充配置中新的标准属性、属性类型追加在末尾
+    """
+    def merge_aliases(target: dict, extra: dict) -> None:
+        for canonical, aliases in extra.items():
+            merged = target.setdefault(canonical, [])
+            merged.extend(alias for alias in aliases if alias not in merged)
+    
+    merge_aliases(base.setdefault("aliases", {}), overlay.get("aliases", {}))
+    for attribute_type, value_map in overlay.get("value_mapping", {}).items():
+        merge_aliases(base.setdefault("value_mapping", {}).setdefault(attribute_type, {}), value_map)
+    return base
+
+
+def _load_attribute_matching_overlay(path: str) -> dict:
+    """读取JSON格式的属性匹配补充配置，文件不存在时返回空配置"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 属性匹配补充配置，可用于按环境追加别名，路径可通过环境变量指定
+ATTRIBUTE_MATCHING_FILE = os.environ.get(
+    "ATTRIBUTE_MATCHING_FILE", os.path.join(BASE_DIR, "attribute_matching.json")
+)
+ATTRIBUTE_MATCHING = _merge_attribute_matching(
+    ATTRIBUTE_MATCHING, _load_attribute_matching_overlay(ATTRIBUTE_MATCHING_FILE)
+)
+
+
+def _freeze(value):
+    """把嵌套的 dict/list 配置转换为只读的 MappingProxyType/tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# 属性匹配配置只读，防止运行时被意外修改
+ATTRIBUTE_MATCHING = _freeze(ATTRIBUTE_MATCHING)
+
+# 别名 -> 标准属性名 的倒排索引（标准属性名映射到自身）
+# 逆序构建，同一名称对应多个标准属性时按配置顺序保留先出现的标准属性
+ALIAS_TO_CANONICAL = MappingProxyType({
+    name: canonical
+    for canonical, aliases in reversed(ATTRIBUTE_MATCHING["aliases"].items())
+    for name in (canonical, *aliases)
+})
+
+# 标准属性名到数据库字段名的映射，材质表、尺寸表和属性可选值查询共用
+CANONICAL_FIELD_MAP = MappingProxyType({
+    "鞋面材质": "upper",
+    "内里材质": "lining",
+    "鞋底材质": "outsole",
+    "鞋垫材质": "insole",
+    "闭合方式": "closure_type",
+    "鞋头款式": "toe_shape",
+    "鞋跟款式": "heel_shape",
+    "后跟高": "heel_height",
+    "鞋跟高度": "heel_height",
+    "靴筒高度": "boot_shaft_height",
+    "鞋底厚度": "platform_height",
+})
@@ -1,45 +1,169 @@
+import time
 import logging
-from typing import Dict, List, Any
-import mysql.connector
-from mysql.connector import Error
-from config import DB_CONFIG
+import threading
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from config import DB_CONFIG, CACHE_CONFIG, ALIAS_TO_CANONICAL, CANONICAL_FIELD_MAP
+from alias_trie import first_matching_field
 
 logger = logging.getLogger(__name__)
 
+# 查询语句模板，语句文本固定，只有字段列表和 IN 占位符数量随调用变化
+
+# 单个产品：基本信息表关联材质表（按product_id）和尺寸表（按original_product_number），一次往返取回全部数据
+# 材质表、尺寸表字段名可能重复，用标记列分隔两段字段，标记列同时表示该表是否有匹配行
+_PRODUCT_ROWS_QUERY = """
+SELECT p.id AS __product_id__,
+       p.original_product_number AS __original_product_number__,
+       {material_columns},
+       {size_columns}
+FROM intrinsic_attributes_productbaseinfo p
+LEFT JOIN intrinsic_attributes_productmaterial m ON m.product_id = p.id
+LEFT JOIN intrinsic_attributes_productsize s ON s.original_product_number = p.original_product_number
+WHERE p.product_number = %s
+LIMIT 1
+"""
+
+# 批量查询：每张表一条 IN 查询
+_BASE_ROWS_QUERY = """
+SELECT id, product_number, original_product_number
+FROM intrinsic_attributes_productbaseinfo
+WHERE product_number IN ({placeholders})
+"""
+
+_MATERIAL_ROWS_QUERY = """
+SELECT {columns}
+FROM intrinsic_attributes_productmaterial
+WHERE product_id IN ({placeholders})
+"""
+
+_SIZE_ROWS_QUERY = """
+SELECT {columns}
+FROM intrinsic_attributes_productsize
+WHERE original_product_number IN ({placeholders})
+"""
+
+_SCHEMA_QUERY = """
+SELECT table_name, column_name
+FROM information_schema.columns
+WHERE table_schema = %s
+  AND table_name IN ({placeholders})
+ORDER BY table_name, ordinal_position
+"""
+
+
+def _placeholders(count: int) -> str:
+    """生成 IN 查询的参数占位符"""
+    return ",".join(["%s"] * count)
+
+
+def _quote_identifier(name: str) -> str:
+    """用反引号引用表名或字段名，名称中的反引号转义为两个"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+# 按产品货号缓存的数据行，仅在 cached_rows() 上下文内启用
+# 存放在上下文变量中，并发处理的请求各自使用自己的缓存；值为数据库实例到其缓存的字典
+_ROW_CACHES = ContextVar("product_row_caches", default=None)
+
 
 class ProductDatabase:
     
-    def __init__(self, config=None):
+    # 材质表、尺寸表中属性名到字段名的映射
+    MATERIAL_FIELD_MAPPING = {
+        attr: CANONICAL_FIELD_MAP[attr] for attr in ("鞋面材质", "内里材质", "鞋底材质", "鞋垫材质")
+    }
+    SIZE_FIELD_MAPPING = {
+        attr: CANONICAL_FIELD_MAP[attr] for attr in ("后跟高", "靴筒高度", "鞋跟高度", "鞋底厚度")
+    }
+    
+    # 查询属性可选值时常见属性名对应的字段名，靴筒高度在这里沿用 tube_height 字段
+    ATTRIBUTE_FIELD_MAPPING = {
+        **{attr: field for attr, field in CANONICAL_FIELD_MAP.items() if attr != "鞋底厚度"},
+        "靴筒高度": "tube_height",
+    }
+    
+    # 属性值查询依次检查的数据表
+    ATTRIBUTE_TABLES = (
+        "intrinsic_attributes_productmaterial",  # 材质表
+        "intrinsic_attributes_productsize",      # 尺寸表
+        "intrinsic_attributes_productbaseinfo"   # 基本信息表
+    )
+    
+    def __init__(self, config=None, pool_config=None):
         self.config = config or DB_CONFIG["mysql"]
-        self.connection = None
+        self.pool_config = pool_config or DB_CONFIG["pool"]
+        self.pool = None
+        # 连接池取不到连接时直接报错而不会等待，并发请求数超过连接池大小时在这里排队等待空闲连接
+        self._pool_slots = threading.BoundedSemaphore(self.pool_config["pool_size"])
+        # 数据表字段信息缓存，首次使用时加载，调用 reload_schema() 后重新加载
+        self._schema_cache = None
+        # 按投影字段组合缓存的单个产品查询语句，依赖字段信息，随字段信息一起清空
+        self._query_cache = {}
+        # 属性名到 (可选值列表, 过期时间) 的缓存，以及正在后台刷新的属性名
+        self._values_cache = {}
+        self._values_refreshing = set()
+        self._values_lock = threading.Lock()
         self.connect()
     
     def connect(self):
+        # mysql.connector 首次建立连接池时才导入，不访问数据库的代码路径无需加载驱动
+        from mysql.connector import Error
+        from mysql.connector.pooling import MySQLConnectionPool
+        
         try:
-            self.connection = mysql.connector.connect(
+            self.pool = MySQLConnectionPool(
                 host=self.config["host"],
                 port=self.config["port"],
                 user=self.config["user"],
                 password=self.config["password"],
                 database=self.config["database"],
-                charset=self.config["charset"]
+                charset=self.config["charset"],
+                autocommit=self.config.get("autocommit", True),
+                **self.pool_config
             )
-            logger.info("数据库连接成功")
+            logger.info("数据库连接池创建成功")
         except Error as e:
-            logger.error(f"数据库连接失败: {e}")
-            self.connection = None
+            logger.error("数据库连接失败: %s", e)
+            self.pool = None
     
-    def reconnect_if_needed(self):
+    @contextmanager
+    def _connection(self):
+        """
+        从连接池取出一个连接，退出上下文时归还
+        
+        连接池尚未创建时先尝试创建；连接池不可用或取连接失败时得到None。
+        连接全部被占用时等待其他请求归还，等待超时抛出 TimeoutError，不会当作没有数据处理
+        """
+        if self.pool is None:
+            self.connect()
+        
+        if self.pool is None:
+            yield None
+            return
+        
+        if not self._pool_slots.acquire(timeout=DB_CONFIG["pool_timeout"]):
+            raise TimeoutError(f"等待数据库连接超时（{DB_CONFIG['pool_timeout']}秒）")
+        
+        connection = None
         try:
-            if self.connection is None or not self.connection.is_connected():
-                logger.info("重新连接数据库")
-                self.connect()
-        except Exception as e:
-            logger.error(f"重新连接数据库失败: {e}")
+            from mysql.connector import Error
+            try:
+                connection = self.pool.get_connection()
+            except Error as e:
+                logger.error("获取数据库连接失败: %s", e)
+            
+            yield connection
+        finally:
+            if connection is not None:
+                connection.close()
+            self._pool_slots.release()
     
     def close(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        if self.pool is not None:
+            self.pool._remove_connections()
+            self.pool = None
             logger.info("数据库连接已关闭")
     
     def get_product_data(self, product_number: str, attributes: List[str]) -> Dict[str, Any]:
@@ -53,124 +177,352 @@ class ProductDatabase:
         Returns:
             Dict[str, Any]: 属性名称和值的字典
         """
-        self.reconnect_if_needed()
         result = {}
         
-        if not self.connection:
-            logger.warning("数据库未连接，无法获取产品数据")
+        rows = self.load_product_rows(product_number, attributes)
+        if rows is None:
             return result
         
-        try:
-            # 首先，根据product_number从productbaseinfo表中查询产品ID和original_product_number
-            base_query = """
-            SELECT id, original_product_number
-            FROM intrinsic_attributes_productbaseinfo
-            WHERE product_number = %s
-            LIMIT 1
-            """
-            
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(base_query, (product_number,))
-            
-            product_row = cursor.fetchone()
-            
-            if not product_row:
-                logger.warning(f"找不到产品: {product_number}")
-                cursor.close()
-                return result
-                
-            product_id = product_row['id']
-            original_product_number = product_row.get('original_product_number', product_number)
-            logger.info(f"找到产品ID: {product_id}, 原始产品编号: {original_product_number}")
-            
-            # 查询材质信息和尺寸信息
-            self.query_material_data(product_id, attributes, result)
-            self.query_size_data(original_product_number, attributes, result)
-            
-            cursor.close()
+        material_row, size_row = rows
         
-        except Exception as e:
-            logger.error(f"查询产品数据失败: {e}")
+        # 处理材质属性和尺寸属性
+        if material_row:
+            self.process_attributes(attributes, material_row, result, self.MATERIAL_FIELD_MAPPING)
+        if size_row:
+            self.process_attributes(attributes, size_row, result, self.SIZE_FIELD_MAPPING)
         
         return result
     
-    def query_material_data(self, product_id: int, attributes: List[str], result: Dict[str, Any]) -> None:
+    def get_products_data(self, product_numbers: List[str], attributes: List[str]) -> Dict[str, Dict[str, Any]]:
         """
-        查询产品材质数据
+        批量获取多个产品特定属性的数据
         
         Args:
-            product_id: 产品ID
-            attributes: 要查询的属性列表
-            result: 结果字典，将直接修改此字典
+            product_numbers: 产品货号列表
+            attributes: 需要获取的属性列表
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: 产品货号到属性名称和值字典的映射，查询失败时为空字典
         """
+        results = {}
+        
+        rows_by_product = self.fetch_products_rows(product_numbers, attributes)
+        if rows_by_product is None:
+            return results
+        
+        for product_number, (material_row, size_row) in rows_by_product.items():
+            result = {}
+            if material_row:
+                self.process_attributes(attributes, material_row, result, self.MATERIAL_FIELD_MAPPING)
+            if size_row:
+                self.process_attributes(attributes, size_row, result, self.SIZE_FIELD_MAPPING)
+            results[product_number] = result
+        
+        return results
+    
+    def load_product_rows(self, product_number: str, 
+                          attributes: Optional[List[str]] = None) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+        """
+        优先从行缓存中获取产品数据行，未命中时查询数据库并写入缓存
+        
+        缓存记录了数据行是为哪些属性查询的，缓存的字段不足以覆盖本次属性时，按合并后的属性重新查询
+        
+        Args:
+            product_number: 产品货号
+            attributes: 需要的属性列表，None 表示查询全部字段
+        """
+        needed = None if attributes is None else frozenset(attributes)
+        
+        row_cache = self._row_cache()
+        if row_cache is not None:
+            cached = row_cache.get(product_number)
+            if cached is not None:
+                material_row, size_row, covered = cached
+                if covered is None or (needed is not None and needed <= covered):
+                    return material_row, size_row
+                if needed is not None:
+                    needed |= covered
+        
+        rows = self.fetch_product_rows(product_number, needed)
+        if rows is not None and row_cache is not None:
+            row_cache[product_number] = (*rows, needed)
+        return rows
+    
+    def prefetch_product_rows(self, product_number: str, attributes: Optional[Iterable[str]] = None) -> None:
+        """
+        在 cached_rows() 上下文内预先查询并缓存产品数据行
+        
+        在其他线程中执行时需通过 contextvars.copy_context().run 调用，以写入调用方的缓存
+        
+        Args:
+            product_number: 产品货号
+            attributes: 之后可能用到的属性，只查询这些属性的字段；None 表示查询全部字段
+        """
+        if self._row_cache() is not None:
+            self.load_product_rows(product_number, attributes)
+    
+    def prefetch_products_rows(self, product_numbers: List[str]) -> None:
+        """在 cached_rows() 上下文内一次性批量查询并缓存尚未缓存的多个产品的数据行"""
+        row_cache = self._row_cache()
+        if row_cache is None:
+            return
+        
+        missing = [pn for pn in dict.fromkeys(product_numbers) if pn not in row_cache]
+        if len(missing) < 2:
+            # 单个产品走单条联合查询
+            for product_number in missing:
+                self.load_product_rows(product_number)
+            return
+        
+        rows_by_product = self.fetch_products_rows(missing)
+        if rows_by_product is not None:
+            for product_number, rows in rows_by_product.items():
+                row_cache[product_number] = (*rows, None)
+    
+    def _row_cache(self) -> Optional[Dict[str, Any]]:
+        """当前上下文中本实例的数据行缓存，不在 cached_rows() 上下文内时返回None"""
+        caches = _ROW_CACHES.get()
+        return None if caches is None else caches.get(self)
+    
+    @contextmanager
+    def cached_rows(self):
+        """
+        在上下文内缓存按产品查询到的数据行，同一产品的多次属性查询只访问一次数据库
+        
+        可嵌套使用，仅最外层上下文负责创建和清理缓存
+        """
+        if self._row_cache() is not None:
+            yield
+            return
+        
+        token = _ROW_CACHES.set({**(_ROW_CACHES.get() or {}), self: {}})
         try:
-            # 查询材质数据
-            material_query = """
-            SELECT *
-            FROM intrinsic_attributes_productmaterial
-            WHERE product_id = %s
-            LIMIT 1
-            """
+            yield
+        finally:
+            _ROW_CACHES.reset(token)
+    
+    def fetch_product_rows(self, product_number: str, 
+                           attributes: Optional[Iterable[str]] = None) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+        """
+        一次查询获取产品的材质数据行和尺寸数据行
+        
+        Args:
+            product_number: 产品货号
+            attributes: 需要的属性，只查询这些属性可能用到的字段；None 表示查询全部字段
             
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(material_query, (product_id,))
-            material_row = cursor.fetchone()
-            cursor.close()
+        Returns:
+            Optional[Tuple]: (材质数据行, 尺寸数据行)，找不到的数据行为None；数据库不可用或查询失败时返回None
+        """
+        with self._connection() as connection:
+            if connection is None:
+                logger.warning("数据库未连接，无法获取产品数据")
+                return None
             
-            if material_row:
-                logger.info(f"找到产品材质数据")
+            try:
+                with closing(connection.cursor()) as cursor:
+                    cursor.execute(self.product_rows_query(connection, attributes), (product_number,))
+                    row = cursor.fetchone()
+                    columns = cursor.column_names
                 
-                # 处理材质属性
-                self.process_attributes(attributes, material_row, result, {
-                    "鞋面材质": "upper",
-                    "内里材质": "lining",
-                    "鞋底材质": "outsole",
-                    "鞋垫材质": "insole"
-                })
-            else:
-                logger.warning(f"找不到产品材质数据: product_id={product_id}")
+                if not row:
+                    logger.warning("找不到产品: %s", product_number)
+                    return None, None
                 
-        except Exception as e:
-            logger.error(f"查询材质数据失败: {e}")
+                product_id, original_product_number = row[0], row[1]
+                logger.info("找到产品ID: %s, 原始产品编号: %s", product_id, original_product_number)
+                
+                material_start = columns.index("__material__")
+                size_start = columns.index("__size__")
+                
+                material_row = None
+                if row[material_start]:
+                    material_row = dict(zip(columns[material_start + 1:size_start], row[material_start + 1:size_start]))
+                    logger.info("找到产品材质数据")
+                else:
+                    logger.warning("找不到产品材质数据: product_id=%s", product_id)
+                
+                size_row = None
+                if row[size_start]:
+                    size_row = dict(zip(columns[size_start + 1:], row[size_start + 1:]))
+                    logger.info("找到产品尺寸数据")
+                else:
+                    logger.warning("找不到产品尺寸数据: original_product_number=%s", original_product_number)
+                
+                return material_row, size_row
+            
+            except Exception as e:
+                logger.error("查询产品数据失败: %s", e)
+                return None
     
-    def query_size_data(self, original_product_number: str, attributes: List[str], result: Dict[str, Any]) -> None:
+    def product_rows_query(self, connection, attributes: Optional[Iterable[str]]) -> str:
         """
-        查询产品尺寸数据
+        生成单个产品的联合查询语句，按投影后的字段组合缓存，字段信息重新加载时清空
         
         Args:
-            original_product_number: 原始产品编号
-            attributes: 要查询的属性列表
-            result: 结果字典，将直接修改此字典
+            connection: 数据库连接
+            attributes: 需要的属性，None 表示查询全部字段
+            
+        Returns:
+            str: 查询语句，参数为产品货号
         """
-        try:
-            # 查询尺寸数据
-            size_query = """
-            SELECT *
-            FROM intrinsic_attributes_productsize
-            WHERE original_product_number = %s
-            LIMIT 1
-            """
+        # 属性只遍历一次，两张表的投影都要用到
+        attributes = None if attributes is None else frozenset(attributes)
+        material_projection = self.projected_columns(
+            connection, "intrinsic_attributes_productmaterial", attributes, self.MATERIAL_FIELD_MAPPING)
+        size_projection = self.projected_columns(
+            connection, "intrinsic_attributes_productsize", attributes, self.SIZE_FIELD_MAPPING)
+        
+        # 属性名来自请求，种类没有上限；投影后的字段组合只取决于表结构，用它作缓存键不会无限增长
+        key = (
+            None if material_projection is None else tuple(material_projection),
+            None if size_projection is None else tuple(size_projection),
+        )
+        query = self._query_cache.get(key)
+        if query is not None:
+            return query
+        
+        material_columns = ", ".join([
+            "m.product_id IS NOT NULL AS __material__",
+            *self.select_columns("m", material_projection)
+        ])
+        size_columns = ", ".join([
+            "s.original_product_number IS NOT NULL AS __size__",
+            *self.select_columns("s", size_projection)
+        ])
+        query = _PRODUCT_ROWS_QUERY.format(material_columns=material_columns, size_columns=size_columns)
+        
+        # 字段信息不可用时生成的是查询全部字段的语句，不缓存，待字段信息可用后重新生成
+        if self._schema_cache is not None:
+            self._query_cache[key] = query
+        return query
+    
+    def fetch_products_rows(self, product_numbers: List[str], 
+                            attributes: Optional[Iterable[str]] = None) -> Optional[Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]]:
+        """
+        批量查询多个产品的材质数据行和尺寸数据行，每张表只查询一次
+        
+        Args:
+            product_numbers: 产品货号列表
+            attributes: 需要的属性，只查询这些属性可能用到的字段；None 表示查询全部字段
             
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(size_query, (original_product_number,))
-            size_row = cursor.fetchone()
-            cursor.close()
+        Returns:
+            Optional[Dict]: 产品货号到 (材质数据行, 尺寸数据行) 的映射，找不到的产品对应 (None, None)；
+                数据库不可用或查询失败时返回None
+        """
+        product_numbers = list(dict.fromkeys(product_numbers))
+        if not product_numbers:
+            return {}
+        
+        with self._connection() as connection:
+            if connection is None:
+                logger.warning("数据库未连接，无法获取产品数据")
+                return None
             
-            if size_row:
-                logger.info(f"找到产品尺寸数据")
+            try:
+                with closing(connection.cursor(dictionary=True)) as cursor:
+                    cursor.execute(_BASE_ROWS_QUERY.format(placeholders=_placeholders(len(product_numbers))), 
+                                   product_numbers)
+                    
+                    # 同一货号存在多条记录时与单条查询一致，取第一条
+                    base_rows = {}
+                    for row in cursor.fetchall():
+                        base_rows.setdefault(row["product_number"], row)
+                    
+                    product_ids = list(dict.fromkeys(row["id"] for row in base_rows.values()))
+                    original_numbers = list(dict.fromkeys(
+                        row["original_product_number"] for row in base_rows.values()
+                        if row["original_product_number"] is not None
+                    ))
+                    
+                    # 分组所需的关联字段始终查询
+                    material_columns = self.projected_columns(connection, "intrinsic_attributes_productmaterial", 
+                                                              attributes, self.MATERIAL_FIELD_MAPPING, ("product_id",))
+                    size_columns = self.projected_columns(connection, "intrinsic_attributes_productsize", 
+                                                          attributes, self.SIZE_FIELD_MAPPING, ("original_product_number",))
+                    
+                    material_rows = {}
+                    if product_ids:
+                        cursor.execute(_MATERIAL_ROWS_QUERY.format(
+                            columns=", ".join(self.select_columns(None, material_columns)),
+                            placeholders=_placeholders(len(product_ids))
+                        ), product_ids)
+                        for row in cursor.fetchall():
+                            material_rows.setdefault(row["product_id"], row)
+                    
+                    size_rows = {}
+                    if original_numbers:
+                        cursor.execute(_SIZE_ROWS_QUERY.format(
+                            columns=", ".join(self.select_columns(None, size_columns)),
+                            placeholders=_placeholders(len(original_numbers))
+                        ), original_numbers)
+                        for row in cursor.fetchall():
+                            size_rows.setdefault(row["original_product_number"], row)
                 
-                # 处理尺寸属性
-                self.process_attributes(attributes, size_row, result, {
-                    "后跟高": "heel_height",
-                    "靴筒高度": "boot_shaft_height",
-                    "鞋跟高度": "heel_height",
-                    "鞋底厚度": "platform_height"
-                })
-            else:
-                logger.warning(f"找不到产品尺寸数据: original_product_number={original_product_number}")
+                results = {}
+                for product_number in product_numbers:
+                    base_row = base_rows.get(product_number)
+                    if base_row is None:
+                        logger.warning("找不到产品: %s", product_number)
+                        results[product_number] = (None, None)
+                        continue
+                    results[product_number] = (
+                        material_rows.get(base_row["id"]),
+                        size_rows.get(base_row["original_product_number"])
+                    )
                 
-        except Exception as e:
-            logger.error(f"查询尺寸数据失败: {e}")
+                logger.info("批量查询产品数据: 请求 %d 个，找到 %d 个", len(product_numbers), len(base_rows))
+                return results
+            
+            except Exception as e:
+                logger.error("批量查询产品数据失败: %s", e)
+                return None
+    
+    def projected_columns(self, connection, table_name: str, attributes: Optional[Iterable[str]], 
+                          field_mapping: Dict[str, str], required: Tuple[str, ...] = ()) -> Optional[List[str]]:
+        """
+        根据属性列表计算数据表需要查询的字段，使 process_attributes 在投影后的数据行上得到与完整数据行相同的结果
+        
+        Args:
+            connection: 数据库连接
+            table_name: 表名
+            attributes: 属性列表，None 表示查询全部字段
+            field_mapping: 属性名到字段名的映射
+            required: 始终需要查询的字段
+            
+        Returns:
+            Optional[List[str]]: 按表中定义顺序排列的字段列表；需要全部字段或字段信息不可用时返回None
+        """
+        if attributes is None:
+            return None
+        
+        columns = self.get_schema(connection).get(table_name)
+        if not columns:
+            return None
+        
+        fields = tuple(columns)
+        needed = {field.lower() for field in required}
+        for attr in attributes:
+            # 属性名本身、映射字段
+            needed.add(attr.lower())
+            mapped_field = field_mapping.get(attr)
+            if mapped_field:
+                needed.add(mapped_field.lower())
+            # 标准属性名对应的字段
+            needed.update(field.lower() for field in self.alias_fields(attr, field_mapping))
+            # 别名匹配只取第一个匹配的字段，保留它即可
+            index = first_matching_field(attr, fields)
+            if index is not None:
+                needed.add(fields[index])
+        
+        return [column for field_lower, column in columns.items() if field_lower in needed]
+    
+    @staticmethod
+    def select_columns(alias: Optional[str], columns: Optional[List[str]]) -> List[str]:
+        """生成 SELECT 字段表达式列表，columns 为None时选择全部字段"""
+        prefix = f"{alias}." if alias else ""
+        if columns is None:
+            return [f"{prefix}*"]
+        return [f"{prefix}{_quote_identifier(column)}" for column in columns]
     
     def process_attributes(self, attributes: List[str], row_data: Dict[str, Any], 
                            result: Dict[str, Any], field_mapping: Dict[str, str]) -> None:
@@ -183,6 +535,7 @@ class ProductDatabase:
             result: 结果字典，将直接修改此字典
             field_mapping: 属性名到字段名的映射
         """
+        fields = tuple(row_data)
         for attr in attributes:
             if attr in row_data:
                 result[attr] = row_data[attr]
@@ -191,17 +544,36 @@ class ProductDatabase:
             if mapped_field and mapped_field in row_data:
                 result[attr] = row_data[mapped_field]
             
+            if attr in result:
+                continue
+            
+            # 属性名是配置中的别名时，按标准属性名及其映射字段直接查找，命中时无需模糊匹配
+            alias_field = next((field for field in self.alias_fields(attr, field_mapping) if field in row_data), None)
+            if alias_field is not None:
+                result[attr] = row_data[alias_field]
+                continue
+            
             # 尝试通过别名匹配（数据库字段可能与请求属性名不完全一致）
-            if attr not in result:
-                for field, value in row_data.items():
-                    # 简单的匹配逻辑：检查属性名是否是字段的一部分，或字段是否是属性名的一部分
-                    if (attr.lower() in field.lower() or field.lower() in attr.lower()) and attr not in result:
-                        result[attr] = value
-                        break
+            # 匹配逻辑：属性名是字段的一部分，或字段是属性名的一部分，取第一个匹配的字段
+            # 字段名的小写形式随字段匹配索引按字段组缓存，属性名每次只转换一次
+            index = first_matching_field(attr, fields)
+            if index is not None:
+                result[attr] = row_data[fields[index]]
+    
+    @staticmethod
+    def alias_fields(attr: str, field_mapping: Dict[str, str]) -> Tuple[str, ...]:
+        """属性名为别名时，返回依次尝试的字段名：标准属性名、标准属性名映射的字段"""
+        canonical = ALIAS_TO_CANONICAL.get(attr)
+        if canonical is None or canonical == attr:
+            return ()
+        mapped_field = field_mapping.get(canonical)
+        return (canonical, mapped_field) if mapped_field else (canonical,)
     
     def get_attribute_values(self, attribute_name: str) -> List[str]:
         """
-        获取某个属性的所有可能值
+        获取某个属性的所有可能值，结果在内存中缓存
+        
+        缓存过期后仍立即返回旧值，同时在后台线程中重新查询，查询完成后替换缓存
         
         Args:
             attribute_name: 属性名称
@@ -209,107 +581,183 @@ class ProductDatabase:
         Returns:
             List[str]: 该属性的所有已知值
         """
-        self.reconnect_if_needed()
-        results = []
+        with self._values_lock:
+            entry = self._values_cache.get(attribute_name)
+            stale = entry is not None and entry[1] < time.monotonic()
+            if stale and attribute_name not in self._values_refreshing:
+                self._values_refreshing.add(attribute_name)
+            else:
+                stale = False
         
-        if not self.connection:
-            logger.warning("数据库未连接，无法获取属性值")
-            return results
+        if entry is not None:
+            if stale:
+                threading.Thread(
+                    target=self.refresh_attribute_values, args=(attribute_name,), daemon=True
+                ).start()
+            return list(entry[0])
         
+        values = self.query_attribute_values(attribute_name)
+        self.store_attribute_values(attribute_name, values)
+        return list(values)
+    
+    def refresh_attribute_values(self, attribute_name: str) -> None:
+        """重新查询属性可选值并更新缓存"""
         try:
-            # 映射常见的属性名对应的字段名
-            field_mapping = {
-                "鞋面材质": "upper",
-                "内里材质": "lining",
-                "鞋底材质": "outsole",
-                "鞋垫材质": "insole",
-                "闭合方式": "closure_type",
-                "鞋头款式": "toe_shape",
-                "后跟高": "heel_height",
-                "靴筒高度": "tube_height",
-                "鞋跟高度": "heel_height",
-                "鞋跟款式": "heel_shape",
-            }
-            
-            # 尝试找到对应的字段名
-            field_name = field_mapping.get(attribute_name, attribute_name)
-            
-            # 构建查询SQL（简单防止SQL注入）
-            safe_field_name = field_name.replace("'", "''")
+            values = self.query_attribute_values(attribute_name)
+            self.store_attribute_values(attribute_name, values)
+        finally:
+            with self._values_lock:
+                self._values_refreshing.discard(attribute_name)
+    
+    def store_attribute_values(self, attribute_name: str, values: List[str]) -> None:
+        """写入属性可选值缓存，空结果（字段不存在或查询失败）不缓存，超过容量时淘汰最早写入的条目"""
+        if not values:
+            return
+        
+        with self._values_lock:
+            self._values_cache.pop(attribute_name, None)
+            while len(self._values_cache) >= CACHE_CONFIG["attribute_values_maxsize"]:
+                self._values_cache.pop(next(iter(self._values_cache)))
+            self._values_cache[attribute_name] = (values, time.monotonic() + CACHE_CONFIG["attribute_values_ttl"])
+    
+    def query_attribute_values(self, attribute_name: str) -> List[str]:
+        """
+        从数据库查询某个属性的所有可能值
+        
+        Args:
+            attribute_name: 属性名称
             
-            # 检查各个表中是否存在该字段并获取值
-            tables_to_check = [
-                "intrinsic_attributes_productmaterial",  # 材质表
-                "intrinsic_attributes_productsize",      # 尺寸表
-                "intrinsic_attributes_productbaseinfo"   # 基本信息表
-            ]
+        Returns:
+            List[str]: 该属性的所有已知值
+        """
+        results = []
+        
+        with self._connection() as connection:
+            if connection is None:
+                logger.warning("数据库未连接，无法获取属性值")
+                return results
             
-            for table_name in tables_to_check:
-                # 检查字段是否存在
-                field_exists = self.check_field_exists(table_name, safe_field_name)
+            try:
+                # 尝试找到对应的字段名
+                field_name = self.ATTRIBUTE_FIELD_MAPPING.get(attribute_name, attribute_name)
                 
-                if field_exists:
-                    # 获取该表中的所有不同值
-                    values = self.get_distinct_values(table_name, safe_field_name)
+                # 检查各个表中是否存在该字段并获取值
+                for table_name in self.ATTRIBUTE_TABLES:
+                    # 检查字段是否存在
+                    field_exists = self.check_field_exists(connection, table_name, field_name)
                     
-                    # 添加到结果中
-                    for value in values:
-                        if value and value not in results:
-                            results.append(value)
-                    
-                    # 如果已经找到值，不需要继续查找其他表
-                    if results:
-                        break
-            
-            if not results:
-                logger.warning(f"在所有表中都找不到字段: {field_name}")
+                    if field_exists:
+                        # 获取该表中的所有不同值
+                        values = self.get_distinct_values(connection, table_name, field_name)
+                        
+                        # 添加到结果中
+                        for value in values:
+                            if value and value not in results:
+                                results.append(value)
+                        
+                        # 如果已经找到值，不需要继续查找其他表
+                        if results:
+                            break
+                
+                if not results:
+                    logger.warning("在所有表中都找不到字段: %s", field_name)
+                
+            except Exception as e:
+                logger.error("获取属性值失败: %s", e)
             
-        except Exception as e:
-            logger.error(f"获取属性值失败: {e}")
+            return results
+    
+    def get_schema(self, connection) -> Dict[str, Dict[str, str]]:
+        """
+        获取属性相关数据表的字段信息，首次调用时一次查询 information_schema 并缓存
         
-        return results
+        Args:
+            connection: 数据库连接
+            
+        Returns:
+            Dict[str, Dict[str, str]]: 表名到 {小写字段名: 字段名} 的映射，字段按表中定义顺序排列；查询失败时返回空字典
+        """
+        if self._schema_cache is None:
+            schema = self.query_schema(connection)
+            if schema is None:
+                return {}
+            self._schema_cache = schema
+        return self._schema_cache
     
-    def check_field_exists(self, table_name: str, field_name: str) -> bool:
-        """检查表中是否存在该字段"""
+    def query_schema(self, connection) -> Optional[Dict[str, Dict[str, str]]]:
+        """查询属性相关数据表的全部字段，失败时返回None"""
         try:
-            query = f"""
-            SELECT COUNT(*) AS field_exists
-            FROM information_schema.columns
-            WHERE table_schema = '{self.config['database']}'
-              AND table_name = '{table_name}'
-              AND column_name = '{field_name}'
-            """
+            query = _SCHEMA_QUERY.format(placeholders=_placeholders(len(self.ATTRIBUTE_TABLES)))
             
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query)
-            field_exists = cursor.fetchone()['field_exists'] > 0
-            cursor.close()
+            with closing(connection.cursor()) as cursor:
+                cursor.execute(query, (self.config["database"], *self.ATTRIBUTE_TABLES))
+                schema = {table_name: {} for table_name in self.ATTRIBUTE_TABLES}
+                for table_name, column_name in cursor.fetchall():
+                    schema.setdefault(table_name, {})[column_name.lower()] = column_name
             
-            return field_exists
+            logger.info("加载数据表字段信息: %s", {table: len(columns) for table, columns in schema.items()})
+            return schema
         except Exception as e:
-            logger.error(f"检查字段失败: {e}")
-            return False
+            logger.error("查询数据表字段信息失败: %s", e)
+            return None
     
-    def get_distinct_values(self, table_name: str, field_name: str) -> List[str]:
+    def reload_schema(self) -> None:
+        """清除字段信息缓存，下次使用时重新查询（数据表结构变更后调用）"""
+        self._schema_cache = None
+        self._query_cache = {}
+    
+    def check_field_exists(self, connection, table_name: str, field_name: str) -> bool:
+        """检查表中是否存在该字段（与MySQL一致，字段名不区分大小写）"""
+        return self.resolve_column(connection, table_name, field_name) is not None
+    
+    def resolve_column(self, connection, table_name: str, field_name: str) -> Optional[str]:
+        """
+        按字段信息白名单解析表名和字段名
+        
+        Returns:
+            Optional[str]: 表中实际的字段名，表不在属性相关数据表中或字段不存在时返回None
+        """
+        if table_name not in self.ATTRIBUTE_TABLES:
+            return None
+        return self.get_schema(connection).get(table_name, {}).get(field_name.lower())
+    
+    def get_distinct_values(self, connection, table_name: str, field_name: str) -> List[str]:
+        # 表名、字段名无法作为查询参数传递，只使用白名单中的名称拼接语句
+        column = self.resolve_column(connection, table_name, field_name)
+        if column is None:
+            logger.warning("字段不在白名单中: %s.%s", table_name, field_name)
+            return []
+        
         try:
             query = f"""
-            SELECT DISTINCT `{field_name}` AS value
-            FROM {table_name}
-            WHERE `{field_name}` IS NOT NULL AND `{field_name}` != ''
-            ORDER BY `{field_name}`
+            SELECT DISTINCT {_quote_identifier(column)} AS value
+            FROM {_quote_identifier(table_name)}
+            WHERE {_quote_identifier(column)} IS NOT NULL AND {_quote_identifier(column)} != ''
+            LIMIT %s
             """
             
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query)
+            limit = DB_CONFIG["distinct_values_limit"]
+            # 非缓冲游标按批读取，驱动不必先把整个结果集载入内存；LIMIT 保证结果读完后游标可正常关闭
+            with closing(connection.cursor(buffered=False)) as cursor:
+                cursor.execute(query, (limit,))
+                
+                values = []
+                while True:
+                    rows = cursor.fetchmany(DB_CONFIG["fetch_size"])
+                    if not rows:
+                        break
+                    values.extend(row[0] for row in rows if row[0])
             
-            values = []
-            for row in cursor.fetchall():
-                value = row['value']
-                if value:
-                    values.append(value)
+            if len(values) >= limit:
+                logger.warning("字段值数量达到上限 %d，结果可能不完整: %s.%s", limit, table_name, column)
             
-            cursor.close()
+            # 字段大多没有索引，在数据库中 ORDER BY 需要对全表做文件排序，改为取回后在程序中排序
+            try:
+                values.sort()
+            except TypeError:
+                # 字段值类型不一致时按字符串排序
+                values.sort(key=str)
             return values
         except Exception as e:
-            logger.error(f"获取字段值失败: {e}")
+            logger.error("获取字段值失败: %s", e)
             return [] 
\ No newline at end of file
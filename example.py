@@ -70,7 +70,7 @@ def main():
     
     # # 检查图片是否存在
     # if not os.path.exists(image_path):
-    #     logger.warning(f"测试图片不存在，请确保路径正确: {image_path}")
+    #     logger.warning("测试图片不存在，请确保路径正确: %s", image_path)
     #     print(f"示例4 - 闭合方式: 图片不存在，跳过测试")
     # else:
     #     result = selector.select_attribute_value(
@@ -0,0 +1,157 @@
+import os
+import time
+import hashlib
+import functools
+import inspect
+import logging
+import sqlite3
+import threading
+from typing import Callable, Optional, Sequence
+from config import CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: str) -> str:
+    """根据若干字符串生成缓存键"""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """基于SQLite的LLM响应缓存，跨进程持久化，支持按条目设置过期时间"""
+
+    def __init__(self, path=None):
+        self.path = path or CACHE_CONFIG["path"]
+        self.connection = None
+        self._lock = threading.Lock()
+        self.connect()
+
+    def connect(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )
+            """)
+            self.connection.commit()
+        except Exception as e:
+            logger.error("LLM缓存初始化失败: %s", e)
+            self.connection = None
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[str]: 缓存值，不存在或已过期时返回None
+        """
+        if not self.connection:
+            return None
+
+        try:
+            with self._lock:
+                row = self.connection.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    return None
+
+                value, expires_at = row
+                if expires_at is not None and expires_at < time.time():
+                    self.connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self.connection.commit()
+                    return None
+
+                return value
+        except Exception as e:
+            logger.error("读取LLM缓存失败: %s", e)
+            return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 有效期（秒），None 表示永不过期
+        """
+        if not self.connection:
+            return
+
+        expires_at = time.time() + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                self.connection.execute(
+                    "REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+                self.connection.commit()
+        except Exception as e:
+            logger.error("写入LLM缓存失败: %s", e)
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_cache() -> LLMCache:
+    """获取进程内共享的LLM缓存实例"""
+    return LLMCache()
+
+
+def cached_response(namespace: str, 
+                    key_func: Callable[..., Optional[Sequence[str]]], 
+                    ttl: Optional[float] = None):
+    """
+    装饰器：把函数返回的模型响应写入持久化缓存，相同请求直接返回缓存结果
+    
+    Args:
+        namespace: 缓存键前缀，同步和异步版本使用相同前缀即可共用缓存
+        key_func: 以被装饰函数的参数调用，返回参与生成缓存键的字符串序列，返回None时不使用缓存
+        ttl: 缓存有效期（秒），None 表示永不过期
+        
+    调用失败返回空字符串时不写入缓存
+    """
+    def lookup(args, kwargs):
+        parts = key_func(*args, **kwargs)
+        if parts is None:
+            return None, None
+        key = make_cache_key(namespace, *parts)
+        result = get_llm_cache().get(key)
+        if result is not None:
+            logger.info("模型响应缓存命中: %s", namespace)
+        return key, result
+    
+    def store(key, result):
+        if key is not None and result:
+            get_llm_cache().set(key, result, ttl)
+    
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key, result = lookup(args, kwargs)
+                if result is not None:
+                    return result
+                result = await func(*args, **kwargs)
+                store(key, result)
+                return result
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key, result = lookup(args, kwargs)
+            if result is not None:
+                return result
+            result = func(*args, **kwargs)
+            store(key, result)
+            return result
+        return wrapper
+    
+    return decorator
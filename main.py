@@ -1,9 +1,10 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
-
-from attribute_selector import AttributeSelector
+from config import SERVER_CONFIG
 
 # Define the request model
 class AttributeSelectionRequest(BaseModel):
@@ -17,15 +18,34 @@ class AttributeSelectionResponse(BaseModel):
     product_number: str
     selected_value: str
 
+# Define the batch request model
+class AttributeSelectionBatchRequest(BaseModel):
+    items: List[AttributeSelectionRequest]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one selector (and its database connection) for the lifetime of the app"""
+    # Imported here so importing the app module stays cheap; the selector chain pulls in the
+    # HTTP clients and the database helpers (the embedding model loads on first use)
+    from attribute_selector import AttributeSelector
+    # Database access is pooled and per-request state lives in context variables,
+    # so the selector can serve concurrent requests
+    app.state.selector = AttributeSelector()
+    try:
+        yield
+    finally:
+        app.state.selector.db.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="Product Attribute Selection Service",
     description="Service for selecting appropriate attribute values for products",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.post("/select-attribute", response_model=AttributeSelectionResponse)
-async def select_attribute(request: AttributeSelectionRequest):
+async def select_attribute(request: AttributeSelectionRequest, http_request: Request):
     """
     Select an appropriate attribute value for a product.
     
@@ -36,8 +56,10 @@ async def select_attribute(request: AttributeSelectionRequest):
         AttributeSelectionResponse with selected attribute value
     """
     try:
-        selector = AttributeSelector()
-        result = selector.select_attribute_value(
+        # The selector blocks on the database and the model APIs, so run it in the
+        # threadpool instead of on the event loop
+        result = await run_in_threadpool(
+            http_request.app.state.selector.select_attribute_value,
             request.product_number,
             request.attribute_name,
             request.available_values,
@@ -55,13 +77,55 @@ async def select_attribute(request: AttributeSelectionRequest):
             detail=f"Error processing attribute selection: {str(e)}"
         )
 
+@app.post("/select-attributes-batch", response_model=List[AttributeSelectionResponse])
+async def select_attributes_batch(request: AttributeSelectionBatchRequest, http_request: Request):
+    """
+    Select attribute values for many products in one call.
+    
+    Product rows are fetched with one query per table for the whole batch.
+    
+    Args:
+        request: AttributeSelectionBatchRequest containing the items to process
+        
+    Returns:
+        List of AttributeSelectionResponse in the same order as the request items
+    """
+    try:
+        results = await run_in_threadpool(
+            http_request.app.state.selector.select_attribute_values,
+            [
+                {
+                    "product_number": item.product_number,
+                    "attribute_name": item.attribute_name,
+                    "available_values": item.available_values,
+                    "image_path": item.image_path
+                }
+                for item in request.items
+            ]
+        )
+        
+        return [
+            AttributeSelectionResponse(product_number=result[0], selected_value=result[1])
+            for result in results
+        ]
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing attribute selection batch: {str(e)}"
+        )
+
 def main():
     """Main function to run the FastAPI server"""
+    # 多 worker 模式下 uvicorn 需要以导入字符串的形式加载应用
     uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=14736,
-        log_level="info"
+        "main:app",
+        host=SERVER_CONFIG["host"],
+        port=SERVER_CONFIG["port"],
+        workers=SERVER_CONFIG["workers"],
+        loop=SERVER_CONFIG["loop"],
+        http=SERVER_CONFIG["http"],
+        log_level=SERVER_CONFIG["log_level"]
     )
 
 if __name__ == "__main__":
@@ -1,13 +1,69 @@
+import os
+import json
 import base64
 import logging
 import time
-import requests
-from openai import OpenAI
-from typing import  Optional, List, Dict, Any
-from config import OPENAI_CONFIG, LAOZHANG_CONFIG, VOLCENGINE_CONFIG
-from volcenginesdkarkruntime import Ark
+import asyncio
+import functools
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
+from config import OPENAI_CONFIG, LAOZHANG_CONFIG, VOLCENGINE_CONFIG, IMAGE_CONFIG, CACHE_CONFIG
+from llm_cache import cached_response
 logger = logging.getLogger(__name__)
 
+# HTTP客户端库在首次创建客户端时才导入，只使用火山引擎SDK的调用路径无需加载
+if TYPE_CHECKING:
+    import httpx
+
+try:
+    # 请求体中的base64图片可达数MB，orjson的序列化速度明显快于标准库，未安装时回退到标准库
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """把请求数据序列化为JSON字节串"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode("utf-8")
+
+
+def _loads(content: bytes) -> Any:
+    """解析JSON响应"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def create_async_client() -> "httpx.AsyncClient":
+    """
+    创建异步HTTP客户端，同一批并发请求共用一个客户端以复用连接
+    
+    客户端绑定创建时的事件循环，需在 async with 中使用，不能跨 asyncio.run 复用
+    """
+    import httpx
+    
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=OPENAI_CONFIG["max_connections"],
+            max_keepalive_connections=OPENAI_CONFIG["max_keepalive_connections"]
+        ),
+        timeout=OPENAI_CONFIG["timeout"]
+    )
+
+
+# 需要重试的HTTP状态码：限流和服务端临时错误
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_after_seconds(response: "httpx.Response") -> Optional[float]:
+    """读取响应的 Retry-After 秒数，未提供或不是秒数时返回None"""
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
 
 class OpenAI:
     """OpenAI API客户端"""
@@ -25,12 +81,52 @@ class OpenAI:
         self.chat = ChatCompletions(self.api_key, self.base_url)
 
 
+@functools.lru_cache(maxsize=1)
+def get_openai_client() -> OpenAI:
+    """获取进程内共享的OpenAI客户端，所有请求共用同一个连接池"""
+    return OpenAI(
+        api_key=OPENAI_CONFIG["api_key"],
+        base_url=OPENAI_CONFIG["base_url"]
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_ark_client():
+    """获取进程内共享的火山引擎客户端（SDK较重，首次调用时才导入）"""
+    from volcenginesdkarkruntime import Ark
+    return Ark(
+        api_key=VOLCENGINE_CONFIG["api_key"],
+    )
+
+
 class ChatCompletions:
     
     def __init__(self, api_key, base_url):
         self.api_key = api_key
         self.base_url = base_url
         
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # 复用连接的会话，避免每次请求重新建立TCP和TLS连接
+        self.session = requests.Session()
+        self.session.headers.update(self._get_auth_headers())
+        adapter = HTTPAdapter(
+            pool_connections=OPENAI_CONFIG["pool_connections"],
+            pool_maxsize=OPENAI_CONFIG["pool_maxsize"],
+            # 限流和服务端临时错误在传输层按退避时间重试；POST 默认不在重试范围内，需显式允许
+            max_retries=Retry(
+                total=OPENAI_CONFIG["max_retries"],
+                backoff_factor=OPENAI_CONFIG["backoff_factor"],
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=["POST"],
+                respect_retry_after_header=True
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
     def _get_auth_headers(self):
         """获取包含认证信息的请求头"""
         return {
@@ -38,6 +134,42 @@ class ChatCompletions:
             "Content-Type": "application/json"
         }
     
+    def _build_request_data(self, model: str, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """构建请求数据"""
+        data = {
+            "model": model,
+            "messages": messages,
+        }
+        
+        # 添加其他参数
+        if "temperature" in kwargs:
+            data["temperature"] = kwargs["temperature"]
+        
+        if "max_tokens" in kwargs:
+            data["max_tokens"] = kwargs["max_tokens"]
+        
+        return data
+    
+    def _transform_response(self, model: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """构造与OpenAI格式类似的响应"""
+        return {
+            "id": result.get("id", ""),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                    },
+                    "finish_reason": result.get("choices", [{}])[0].get("finish_reason", "stop")
+                }
+            ],
+            "usage": result.get("usage", {})
+        }
+    
     def create(self, model: str, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         """
         创建聊天请求
@@ -49,75 +181,124 @@ class ChatCompletions:
             
         Returns:
             Dict[str, Any]: OpenAI响应结果
+            
+        Raises:
+            requests.RequestException: 重试耗尽后请求仍失败
         """
         url = f"{self.base_url}/chat/completions"
+        data = self._build_request_data(model, messages, **kwargs)
         
-        # 构建请求数据
-        data = {
-            "model": model,
-            "messages": messages,
-        }
-        
-        # 添加其他参数
-        if "temperature" in kwargs:
-            data["temperature"] = kwargs["temperature"]
-        
-        if "max_tokens" in kwargs:
-            data["max_tokens"] = kwargs["max_tokens"]
+        # 发送请求，失败时由会话的适配器重试
+        response = self.session.post(url, data=_dumps(data), timeout=OPENAI_CONFIG["timeout"])
+        response.raise_for_status()
+        return self._transform_response(model, _loads(response.content))
+    
+    async def acreate(self, 
+                      model: str, 
+                      messages: List[Dict[str, Any]], 
+                      client: Optional["httpx.AsyncClient"] = None, 
+                      **kwargs) -> Dict[str, Any]:
+        """
+        异步创建聊天请求
         
-        # 发送请求
-        try:
-            response = requests.post(url, headers=self._get_auth_headers(), json=data)
-            response.raise_for_status()
-            result = response.json()
+        Args:
+            model: 模型名称
+            messages: 消息列表
+            client: 共用的异步HTTP客户端，不提供时为本次请求单独创建
+            **kwargs: 其他参数，如temperature等
             
-            # 构造与OpenAI格式类似的响应
-            transformed_response = {
-                "id": result.get("id", ""),
-                "object": "chat.completion",
-                "created": int(time.time()),
-                "model": model,
-                "choices": [
-                    {
-                        "index": 0,
-                        "message": {
-                            "role": "assistant",
-                            "content": result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                        },
-                        "finish_reason": result.get("choices", [{}])[0].get("finish_reason", "stop")
-                    }
-                ],
-                "usage": result.get("usage", {})
-            }
+        Returns:
+            Dict[str, Any]: OpenAI响应结果
             
-            return transformed_response
+        Raises:
+            httpx.HTTPError: 重试耗尽后请求仍失败
+        """
+        if client is None:
+            async with create_async_client() as client:
+                return await self.acreate(model, messages, client, **kwargs)
+        
+        import httpx
+        
+        url = f"{self.base_url}/chat/completions"
+        body = _dumps(self._build_request_data(model, messages, **kwargs))
+        max_retries = OPENAI_CONFIG["max_retries"]
+        
+        # 与同步请求的适配器使用相同的重试策略：连接错误和限流、服务端临时错误按指数退避重试，优先使用 Retry-After
+        for attempt in range(max_retries + 1):
+            try:
+                response = await client.post(url, headers=self._get_auth_headers(), content=body)
+            except httpx.TransportError:
+                if attempt == max_retries:
+                    raise
+                delay = None
+            else:
+                if response.status_code not in _RETRY_STATUSES or attempt == max_retries:
+                    response.raise_for_status()
+                    return self._transform_response(model, _loads(response.content))
+                delay = _retry_after_seconds(response)
             
-        except Exception as e:
-            logger.error(f"OpenAI API调用失败: {e}")
-            # 返回一个空响应结构以保持接口一致性
-            return {
-                "id": "",
-                "object": "chat.completion",
-                "created": int(time.time()),
-                "model": model,
-                "choices": [
-                    {
-                        "index": 0,
-                        "message": {
-                            "role": "assistant",
-                            "content": ""
-                        },
-                        "finish_reason": "error"
-                    }
-                ],
-                "usage": {},
-                "error": str(e)
-            }
+            if delay is None:
+                delay = OPENAI_CONFIG["backoff_factor"] * (2 ** attempt)
+            logger.warning("OpenAI API请求失败，%.1f秒后重试 (%d/%d)", delay, attempt + 1, max_retries)
+            await asyncio.sleep(delay)
+
+
+# 图片分块编码的块大小
+_BASE64_CHUNK_SIZE = 57 * 1024
+
+
+def _prepare_image_bytes(image_path: str) -> Optional[bytes]:
+    """
+    把图片缩小到配置的最大尺寸以内并重新编码为JPEG，减少上传数据量和视觉模型的输入token
+    
+    Args:
+        image_path: 图像文件路径
+        
+    Returns:
+        Optional[bytes]: 处理后的JPEG数据；图片已是尺寸以内的JPEG或无法解码时返回None，直接使用原文件
+    """
+    try:
+        # 仅在需要缩放图片时才导入 OpenCV，只调用文本模型的进程不必加载它
+        import cv2
+        import numpy as np
+        
+        _, ext = os.path.splitext(image_path)
+        is_jpeg = ext.lower() in (".jpg", ".jpeg")
+        
+        # 重新编码会丢失EXIF信息，JPEG用 IMREAD_COLOR 解码以按EXIF方向旋转像素，否则视觉模型收到的是旋转的照片；
+        # JPEG没有透明通道，其他格式保持原样解码以保留透明通道
+        flags = cv2.IMREAD_COLOR if is_jpeg else cv2.IMREAD_UNCHANGED
+        # 先读入字节再解码，兼容包含中文的路径
+        image = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), flags)
+        if image is None or image.dtype != np.uint8:
+            return None
+        
+        max_width, max_height = IMAGE_CONFIG["max_size"]
+        height, width = image.shape[:2]
+        scale = min(max_width / width, max_height / height)
+        
+        if scale >= 1 and is_jpeg:
+            return None
+        
+        if image.ndim == 3 and image.shape[2] == 4:
+            # JPEG不支持透明通道，透明部分合成为白色背景
+            alpha = image[:, :, 3:] / 255.0
+            image = (image[:, :, :3] * alpha + 255 * (1 - alpha)).astype(np.uint8)
+        
+        if scale < 1:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        
+        success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, IMAGE_CONFIG["jpeg_quality"]])
+        return buffer.tobytes() if success else None
+    except Exception as e:
+        logger.warning("图像缩放失败，使用原图: %s", e)
+        return None
 
 
 def encode_image_to_base64(image_path: str) -> Optional[str]:
     """
-    将图像编码为base64字符串
+    将图像编码为base64字符串，同一图片（路径、修改时间和大小不变）在进程内只编码一次
     
     Args:
         image_path: 图像文件路径
@@ -126,11 +307,79 @@ def encode_image_to_base64(image_path: str) -> Optional[str]:
         Optional[str]: base64编码的图像字符串，如果失败则返回None
     """
     try:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        stat = os.stat(image_path)
+        return _encode_image(image_path, stat.st_mtime_ns, stat.st_size)
     except Exception as e:
-        logger.error(f"图像编码失败: {e}")
+        logger.error("图像编码失败: %s", e)
+        return None
+
+
+@functools.lru_cache(maxsize=IMAGE_CONFIG["encode_cache_size"])
+def _encode_image(image_path: str, mtime_ns: int, size: int) -> str:
+    """编码图片，修改时间和大小只用作缓存键，图片被替换后重新编码"""
+    # 需要缩小或转换格式的图片编码处理后的JPEG数据
+    image_bytes = _prepare_image_bytes(image_path)
+    if image_bytes is not None:
+        return base64.b64encode(image_bytes).decode("ascii")
+    
+    # 分块读取并编码，避免同时持有完整的原始图片和编码结果；块大小为3的倍数，各块编码后可直接拼接
+    encoded = bytearray()
+    with open(image_path, "rb") as image_file:
+        while chunk := image_file.read(_BASE64_CHUNK_SIZE):
+            encoded.extend(base64.b64encode(chunk))
+    return encoded.decode("ascii")
+
+
+def _chat_messages(prompt: str, system_prompt: str = None) -> List[Dict[str, Any]]:
+    """构建系统消息和用户消息"""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _image_messages(image_base64: str, prompt: str) -> List[Dict[str, Any]]:
+    """构建包含图片和提示词的用户消息"""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{image_base64}"
+                    }
+                }
+            ]
+        }
+    ]
+
+
+# 文本模型固定的采样参数
+_LLM_TEMPERATURE = 0.0
+_LLM_MAX_TOKENS = 1024
+
+
+def _image_cache_key(image_path: str, 
+                     prompt: str, 
+                     max_tokens: int = None, 
+                     client=None, 
+                     image_base64: str = None) -> Optional[List[str]]:
+    """图片分析响应的缓存键：模型、图片路径和修改时间、提示词，图片被替换后不会命中旧结果"""
+    try:
+        stat = os.stat(image_path)
+    except (OSError, TypeError):
         return None
+    return [
+        OPENAI_CONFIG["vision_model"],
+        image_path,
+        str(stat.st_mtime_ns),
+        str(stat.st_size),
+        prompt,
+        str(max_tokens or IMAGE_CONFIG["max_tokens"]),
+    ]
 
 
 def call_openai_llm(prompt: str, system_prompt: str = None, model: str = None) -> str:
@@ -149,43 +398,104 @@ def call_openai_llm(prompt: str, system_prompt: str = None, model: str = None) -
         if model is None:
             model = VOLCENGINE_CONFIG["default_model"]
             
-        messages = []
-        
-        # 添加系统消息
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-            
-        # 添加用户消息
-        messages.append({"role": "user", "content": prompt})
-        
-        # 初始化火山引擎客户端
-        client = Ark(
-            api_key=VOLCENGINE_CONFIG["api_key"],
-        )
+        messages = _chat_messages(prompt, system_prompt)
         
         # 发送请求
-        response = client.chat.completions.create(
+        response = get_ark_client().chat.completions.create(
             model=model,
             messages=messages,
-            temperature=0.0,
-            max_tokens=1024
+            temperature=_LLM_TEMPERATURE,
+            max_tokens=_LLM_MAX_TOKENS
         )
         
         result = response.choices[0].message.content
         return result.strip()
         
     except Exception as e:
-        logger.error(f"火山引擎调用失败: {e}")
+        logger.error("火山引擎调用失败: %s", e)
+        return ""
+
+
+def call_openai_llm_stream(prompt: str, 
+                           system_prompt: str = None, 
+                           model: str = None, 
+                           candidates: Optional[List[str]] = None, 
+                           stop: Optional[List[str]] = None, 
+                           max_tokens: int = None) -> str:
+    """
+    以流式方式调用大语言模型，适用于答案为单个短选项的场景
+    
+    Args:
+        prompt: 用户提示词
+        system_prompt: 系统提示词
+        model: 模型名称，默认使用配置中的模型
+        candidates: 候选答案列表，累计输出已唯一确定为某个候选项时提前结束生成
+        stop: 停止序列，默认使用配置中的值
+        max_tokens: 最大输出token数，默认使用配置中的值
+        
+    Returns:
+        str: 模型响应
+    """
+    try:
+        if model is None:
+            model = VOLCENGINE_CONFIG["default_model"]
+        
+        messages = _chat_messages(prompt, system_prompt)
+        
+        # 候选项中存在以某个候选项为前缀的更长候选项时，该候选项不能作为提前结束的依据
+        candidate_set = set(candidates or [])
+        ambiguous = {
+            candidate for candidate in candidate_set
+            if any(other != candidate and other.startswith(candidate) for other in candidate_set)
+        }
+        
+        # 出现在候选项中的停止序列会截断该候选项，使其永远无法被选中，不使用
+        stop = [
+            sequence for sequence in (stop or VOLCENGINE_CONFIG["stream_stop"])
+            if not any(sequence in candidate for candidate in candidate_set)
+        ]
+        
+        stream = get_ark_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=_LLM_TEMPERATURE,
+            max_tokens=max_tokens or VOLCENGINE_CONFIG["stream_max_tokens"],
+            stop=stop or None,
+            stream=True
+        )
+        
+        chunks = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                chunks.append(content)
+                
+                answer = "".join(chunks).strip()
+                if answer in candidate_set and answer not in ambiguous:
+                    break
+        finally:
+            stream.close()
+        
+        return "".join(chunks).strip()
+        
+    except Exception as e:
+        logger.error("火山引擎流式调用失败: %s", e)
         return ""
 
 
-def analyze_image_with_openai(image_path: str, prompt: str) -> str:
+@cached_response("analyze_image_with_openai", _image_cache_key, ttl=CACHE_CONFIG["llm_response_ttl"])
+def analyze_image_with_openai(image_path: str, prompt: str, max_tokens: int = None) -> str:
     """
     使用OpenAI分析图片
     
     Args:
         image_path: 图片路径
         prompt: 提示词
+        max_tokens: 最大输出token数，默认使用配置中的值
         
     Returns:
         str: 分析结果
@@ -197,37 +507,58 @@ def analyze_image_with_openai(image_path: str, prompt: str) -> str:
             return ""
         
         # 构建消息
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{image_base64}"
-                        }
-                    }
-                ]
-            }
-        ]
-        
-        # 初始化客户端
-        client = OpenAI(
-            api_key=OPENAI_CONFIG["api_key"],
-            base_url=OPENAI_CONFIG["base_url"]
-        )
+        messages = _image_messages(image_base64, prompt)
         
         # 调用智谱AI视觉模型
-        response = client.chat.create(
+        response = get_openai_client().chat.create(
             model=OPENAI_CONFIG["vision_model"],
             messages=messages,
-            max_tokens=1000
+            max_tokens=max_tokens or IMAGE_CONFIG["max_tokens"]
+        )
+        
+        result = response["choices"][0]["message"]["content"]
+        return result.strip()
+        
+    except Exception as e:
+        logger.error("OpenAI图像分析失败: %s", e)
+        return ""
+
+
+@cached_response("analyze_image_with_openai", _image_cache_key, ttl=CACHE_CONFIG["llm_response_ttl"])
+async def aanalyze_image_with_openai(image_path: str, 
+                                     prompt: str, 
+                                     max_tokens: int = None, 
+                                     client: Optional["httpx.AsyncClient"] = None, 
+                                     image_base64: Optional[str] = None) -> str:
+    """
+    异步使用OpenAI分析图片
+    
+    Args:
+        image_path: 图片路径
+        prompt: 提示词
+        max_tokens: 最大输出token数，默认使用配置中的值
+        client: 共用的异步HTTP客户端，不提供时为本次请求单独创建
+        image_base64: 已编码的图片，同一图片的多项分析共用，不提供时读取图片路径编码
+        
+    Returns:
+        str: 分析结果
+    """
+    try:
+        if image_base64 is None:
+            image_base64 = encode_image_to_base64(image_path)
+        if not image_base64:
+            return ""
+        
+        response = await get_openai_client().chat.acreate(
+            model=OPENAI_CONFIG["vision_model"],
+            messages=_image_messages(image_base64, prompt),
+            client=client,
+            max_tokens=max_tokens or IMAGE_CONFIG["max_tokens"]
         )
         
         result = response["choices"][0]["message"]["content"]
         return result.strip()
         
     except Exception as e:
-        logger.error(f"OpenAI图像分析失败: {e}")
-        return "" 
\ No newline at end of file
+        logger.error("OpenAI图像异步分析失败: %s", e)
+        return ""
@@ -0,0 +1,96 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+
+attribute_selector = pytest.importorskip("attribute_selector")
+
+
+class FakeDatabase:
+    """不访问数据库的替身，季节属性不需要产品数据"""
+
+    @contextmanager
+    def cached_rows(self):
+        yield
+
+    def prefetch_product_rows(self, product_number, attributes=None):
+        pass
+
+    def prefetch_products_rows(self, product_numbers):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_run_batch_writes_one_json_line_per_item(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(attribute_selector, "ProductDatabase", FakeDatabase)
+
+    original = attribute_selector.AttributeSelector.process_attribute
+
+    def process_attribute(self, product_number, *args, **kwargs):
+        if product_number == "BAD":
+            raise RuntimeError("boom")
+        return original(self, product_number, *args, **kwargs)
+
+    monkeypatch.setattr(attribute_selector.AttributeSelector, "process_attribute", process_attribute)
+
+    seasons = ["春季", "夏季", "秋季", "冬季"]
+    items = [
+        {"product_number": "A1", "attribute_name": "季节", "available_values": seasons},
+        {"product_number": "BAD", "attribute_name": "季节", "available_values": seasons},
+        {"product_number": "A2", "attribute_name": "季节", "available_values": seasons},
+    ]
+    batch_file = tmp_path / "batch.jsonl"
+    batch_file.write_text("\n".join(json.dumps(item, ensure_ascii=False) for item in items), encoding="utf-8")
+
+    attribute_selector.run_batch(str(batch_file))
+
+    lines = capsys.readouterr().out.splitlines()
+    results = [json.loads(line) for line in lines]
+    expected_season = attribute_selector.get_next_season()
+    assert results == [["A1", expected_season], ["BAD", ""], ["A2", expected_season]]
+
+
+
+def test_run_batch_isolates_invalid_items(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(attribute_selector, "ProductDatabase", FakeDatabase)
+
+    image = tmp_path / "shoe.jpg"
+    image.write_bytes(b"")
+    seasons = ["春季", "夏季", "秋季", "冬季"]
+    lines = [
+        json.dumps({"product_number": "A1", "attribute_name": "季节", "available_values": seasons}, ensure_ascii=False),
+        # 无法解析的行
+        '{"product_number": "BROKEN", ',
+        # 属性名为 null
+        json.dumps({"product_number": "NULL", "attribute_name": None, "available_values": seasons}),
+        # 基于图片分析的属性缺少可用值
+        json.dumps({"product_number": "IMG", "attribute_name": "闭合方式", "image_path": str(image)}, ensure_ascii=False),
+        json.dumps({"product_number": "A2", "attribute_name": "季节", "available_values": seasons}, ensure_ascii=False),
+    ]
+    batch_file = tmp_path / "batch.jsonl"
+    batch_file.write_text("\n".join(lines), encoding="utf-8")
+
+    attribute_selector.run_batch(str(batch_file))
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    expected_season = attribute_selector.get_next_season()
+    assert results == [["A1", expected_season], ["", ""], ["NULL", ""], ["IMG", ""], ["A2", expected_season]]
+
+def test_prefetch_failure_resets_scoped_state(monkeypatch):
+    selector = attribute_selector.AttributeSelector(FakeDatabase())
+    monkeypatch.setattr(selector, "prefetch_image_analyses", lambda image_requests: {("a.jpg", "closure_type"): "系带"})
+
+    def prefetch_value_matches(image_requests, image_analyses):
+        raise KeyError("available_values")
+
+    monkeypatch.setattr(selector, "prefetch_value_matches", prefetch_value_matches)
+
+    with pytest.raises(KeyError):
+        selector.select_attribute_values([{"product_number": "A1", "attribute_name": "季节", "available_values": []}])
+
+    # 预处理中途出错时已设置的批量状态也要恢复，之后的单项请求不能读到过期结果
+    assert attribute_selector._get_scoped(attribute_selector._EXISTING_IMAGES, selector) is None
+    assert attribute_selector._get_scoped(attribute_selector._IMAGE_ANALYSES, selector) is None
+    assert attribute_selector._get_scoped(attribute_selector._VALUE_MATCHES, selector) is None
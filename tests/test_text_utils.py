@@ -0,0 +1,32 @@
+import pytest
+
+from text_utils import clean_attribute_value
+
+
+def _baseline_clean(value):
+    # 原 utils.clean_attribute_value 的逐步替换实现，作为等价性参照
+    if not value:
+        return ""
+    value = value.replace("材质：", "").strip()
+    value = value.replace("主要成分：", "").replace("类型：", "").strip()
+    for char in ["。", "！", "？", "；", "：", "、", "（", "）", "(", ")", "\"", "'"]:
+        value = value.replace(char, "")
+    return value.strip()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("材质：牛皮", "牛皮"),
+    ("类型：（系带）", "系带"),
+    ("主要成分：棉；", "棉"),
+    ("  材质： 羊皮 。", "羊皮"),
+    # 前一步移除后拼出新前缀
+    ("类型主要成分：：", ""),
+    ("主要成分材质：：牛皮", "牛皮"),
+    # 重复前缀
+    ("材质：材质：牛皮", "牛皮"),
+    ("类型：类型：单鞋", "单鞋"),
+    ("", ""),
+])
+def test_clean_attribute_value(value, expected):
+    assert clean_attribute_value(value) == expected
+    assert clean_attribute_value(value) == _baseline_clean(value)
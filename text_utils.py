@@ -0,0 +1,46 @@
+import re
+
+# 材质字符串中分隔多种材质的常见分隔符
+_MATERIAL_SEPARATORS = re.compile("[+，,、/]")
+
+# 需要从属性值中移除的标点符号
+_PUNCTUATION_TABLE = str.maketrans("", "", "。！？；：、（）()\"'")
+
+
+def extract_primary_material(material_str: str) -> str:
+    """
+    从材质字符串中提取主要材质
+    例如："牛皮革+织物" -> "牛皮革"
+    
+    Args:
+        material_str: 材质字符串
+        
+    Returns:
+        str: 主要材质
+    """
+    if not material_str:
+        return ""
+        
+    # 在第一个常见分隔符处截断
+    return _MATERIAL_SEPARATORS.split(material_str, maxsplit=1)[0].strip()
+
+
+def clean_attribute_value(value: str) -> str:
+    """
+    清理属性值字符串
+    
+    Args:
+        value: 属性值字符串
+        
+    Returns:
+        str: 清理后的字符串
+    """
+    if not value:
+        return ""
+        
+    # 按原顺序移除常见的干扰词和格式：前一步移除后可能拼出新的前缀，不能合并成一次替换
+    value = value.replace("材质：", "").strip()
+    value = value.replace("主要成分：", "").replace("类型：", "").strip()
+
+    # 一次移除额外的标点符号
+    return value.translate(_PUNCTUATION_TABLE).strip()
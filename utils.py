@@ -1,15 +1,88 @@
 import os
+import re
+import json
+import asyncio
 import logging
-from typing import List
+import functools
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 import datetime
-from sentence_transformers import SentenceTransformer, util
-from config import OPENAI_CONFIG, IMAGE_CONFIG, ATTRIBUTE_MATCHING
-from openai_utils import call_openai_llm, analyze_image_with_openai
+from config import OPENAI_CONFIG, IMAGE_CONFIG, ATTRIBUTE_MATCHING, EMBEDDING_CONFIG, CACHE_CONFIG
+from openai_utils import (
+    call_openai_llm, 
+    call_openai_llm_stream, 
+    analyze_image_with_openai, 
+    aanalyze_image_with_openai, 
+    create_async_client,
+    encode_image_to_base64
+)
+from llm_cache import get_llm_cache, make_cache_key
+# 纯字符串处理函数位于无第三方依赖的 text_utils 模块，可单独用 mypyc 编译，此处重新导出
+from text_utils import extract_primary_material, clean_attribute_value
 
 logger = logging.getLogger(__name__)
 
-# 加载模型
-model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+# 支持的图片格式
+_IMAGE_FORMATS = frozenset(ext.lower() for ext in IMAGE_CONFIG["formats"])
+
+# 各分析类型对应的图片分析提示词
+_IMAGE_ANALYSIS_PROMPTS = {
+    "closure_type": "这双鞋的闭合方式是什么（如系带、拉链、一脚蹬、魔术贴等)？请只回答闭合方式，不要有其他内容。",
+    "shoe_toe_style": "这双鞋的鞋头款式是什么（如圆头、尖头、方头、鱼嘴、杏头等）？请只回答鞋头款式，不要有其他内容。",
+    "heel_shape": "这双鞋的鞋跟款式是什么（如平跟、圆跟、方跟、尖跟、马蹄跟、坡跟、松糕跟、防水台等）？请只回答鞋跟款式，不要有其他内容。",
+    "heel_height": "这双鞋的鞋跟高度是多少（如低跟，平跟、中跟，高跟，超高跟等）？请只回答鞋跟高度，不要有其他内容。",
+    "opening_depth": "这双鞋的开口深度是多少（如浅口，中口，深口）？请只回答开口深度，不要有其他内容",
+    "style": "这双鞋的风格是什么（如少女风，田园风，民族风，休闲风，极简风，嘻哈风，洛丽塔风，公主风，舒适，性感风等）？请只回答风格，不要有其他内容。",
+    "shoe_shape": "这双鞋的款式是什么（如布鞋,单鞋,乐福鞋,豆豆鞋,穆勒鞋,牛津鞋,时尚休闲鞋,松糕鞋,摇摇鞋,休闲板鞋,帆布鞋,高帮鞋,方根高跟鞋,坡跟鞋,细跟高跟鞋,洞洞鞋,时尚休闲沙滩鞋,时装凉鞋,时尚雪地靴,雨鞋,包头拖,人字拖,一字拖, 弹力靴,袜靴,短靴,马丁靴,切尔西靴,时装靴等）？请只回答款式，不要有其他内容。"
+}
+
+
+def _build_value_pattern(value_map) -> Tuple[re.Pattern, Tuple[Tuple[str, str], ...]]:
+    """
+    为一种属性类型的值映射构建单个正则：每个标准值对应一个可选的前瞻分组，
+    在输入开头依次检查输入中是否出现该标准值的任一别名，一次 match 即可得到全部命中的标准值
+
+    Returns:
+        Tuple: (编译后的正则, 按映射顺序排列的 (分组名, 标准值))
+    """
+    branches = []
+    standard_values = []
+    for order, (standard_value, aliases) in enumerate(value_map.items()):
+        if not aliases:
+            continue
+        group = f"v{order}"
+        branches.append(f"(?=(?P<{group}>.*?(?:{'|'.join(map(re.escape, aliases))})))?")
+        standard_values.append((group, standard_value))
+    return re.compile("".join(branches), re.DOTALL), tuple(standard_values)
+
+
+# 每种属性类型的值别名正则
+_VALUE_PATTERNS = {
+    attribute_type: _build_value_pattern(value_map)
+    for attribute_type, value_map in ATTRIBUTE_MATCHING["value_mapping"].items()
+}
+
+# 值匹配提示词模板：固定说明在前、可变内容在末尾，使同类请求共享完全一致的前缀，便于服务端复用前缀缓存
+_VALUE_MATCH_PROMPT = (
+    "请在给定的可选值中，找出与查询值语义匹配相近或者与查询值相等的选项；"
+    "如果查询值是数字，请直接返回与其匹配的以下鞋跟高度选项:低跟1-3cm,中跟3cm-5cm,高跟6cm-8cm,超高跟8cm以上,平跟小于1cm；"
+    "请直接返回最匹配的选项，不要返回其他多余内容。\n"
+    "可选值: {options}\n"
+    "查询值: {query}"
+)
+
+# 直接采用嵌入匹配结果的相似度阈值
+_EMBEDDING_MATCH_THRESHOLD = ATTRIBUTE_MATCHING["embedding_match_threshold"]
+
+# 默认系统提示词
+_DEFAULT_SYSTEM_PROMPT = "你是一个专业的电商产品属性分析助手，请简洁直接地回答问题，仅返回所需结果。"
+
+_DEFAULT_IMAGE_ANALYSIS_PROMPT = "描述这张图片的主要特征，请简洁回答。"
+
+_IMAGE_MULTI_ANALYSIS_PROMPT = (
+    "请根据图片依次回答以下问题，以JSON对象返回，键为问题前方括号中的名称，值为对应问题的简短回答，"
+    "不要返回JSON以外的内容。\n"
+)
+
 
 def call_llm(prompt: str, system_prompt: str = None, model: str = None) -> str:
     """
@@ -25,59 +98,386 @@ def call_llm(prompt: str, system_prompt: str = None, model: str = None) -> str:
     """
     try:
         if system_prompt is None:
-            system_prompt = "你是一个专业的电商产品属性分析助手，请简洁直接地回答问题，仅返回所需结果。"
+            system_prompt = _DEFAULT_SYSTEM_PROMPT
             
         if model is None:
             model = OPENAI_CONFIG["default_model"]
             
         return call_openai_llm(prompt, system_prompt, model)
     except Exception as e:
-        logger.error(f"LLM调用失败: {e}")
+        logger.error("LLM调用失败: %s", e)
+        return ""
+
+
+def call_llm_stream(prompt: str, candidates: List[str], system_prompt: str = None, model: str = None) -> str:
+    """
+    以流式方式调用大语言模型，答案唯一确定为某个候选项时立即结束生成
+    
+    Args:
+        prompt: 用户提示词
+        candidates: 候选答案列表
+        system_prompt: 系统提示词，默认为专业电商分析助手
+        model: 模型名称，默认使用配置中的模型
+        
+    Returns:
+        str: 模型响应
+    """
+    try:
+        if system_prompt is None:
+            system_prompt = _DEFAULT_SYSTEM_PROMPT
+            
+        if model is None:
+            model = OPENAI_CONFIG["default_model"]
+            
+        return call_openai_llm_stream(prompt, system_prompt, model, candidates=candidates)
+    except Exception as e:
+        logger.error("LLM流式调用失败: %s", e)
         return ""
 
 
-def analyze_image(image_path: str, analysis_type: str) -> str:
+def cached_llm(prompt: str, 
+               ttl: Optional[float] = None, 
+               system_prompt: str = None, 
+               model: str = None, 
+               candidates: Optional[List[str]] = None) -> str:
+    """
+    带持久化缓存的大语言模型调用，提示词空白差异不影响命中
+    
+    Args:
+        prompt: 用户提示词
+        ttl: 缓存有效期（秒），None 表示永不过期
+        system_prompt: 系统提示词
+        model: 模型名称
+        candidates: 候选答案列表，提供时使用流式调用并在答案确定后提前结束，且只缓存属于候选项的回答
+        
+    Returns:
+        str: 模型响应
+    """
+    # 先解析出实际使用的系统提示词和模型再生成缓存键，与 call_llm 的默认值保持一致，切换默认模型后不会命中旧结果
+    if system_prompt is None:
+        system_prompt = _DEFAULT_SYSTEM_PROMPT
+    if model is None:
+        model = OPENAI_CONFIG["default_model"]
+    
+    cache = get_llm_cache()
+    key = make_cache_key(" ".join(prompt.split()), system_prompt, model)
+    
+    # 不属于候选项的回答不会被使用，缓存它只会让同一提示词永远匹配失败；已缓存的这类旧结果同样视为未命中
+    candidate_set = set(candidates) if candidates else None
+    
+    result = cache.get(key)
+    if result is not None and (candidate_set is None or result in candidate_set):
+        logger.info("LLM缓存命中")
+        return result
+    
+    if candidates:
+        result = call_llm_stream(prompt, candidates, system_prompt, model)
+    else:
+        result = call_llm(prompt, system_prompt, model)
+    # 调用失败返回空字符串，不写入缓存
+    if result and (candidate_set is None or result in candidate_set):
+        cache.set(key, result, ttl)
+    return result
+
+
+def find_existing_paths(paths: Iterable[Optional[str]]) -> Set[str]:
+    """
+    批量检查文件是否存在，同一目录只列出一次目录内容，避免对网络共享目录中的文件逐个 stat
+    
+    Args:
+        paths: 文件路径，空值会被忽略
+        
+    Returns:
+        Set[str]: 存在的路径
+    """
+    paths_by_dir = {}
+    for path in paths:
+        if path:
+            paths_by_dir.setdefault(os.path.dirname(path), set()).add(path)
+    
+    existing = set()
+    for directory, dir_paths in paths_by_dir.items():
+        try:
+            with os.scandir(directory or ".") as entries:
+                # 与 os.path.exists 一致，在不区分大小写的系统上忽略文件名大小写
+                names = {os.path.normcase(entry.name) for entry in entries}
+        except OSError:
+            # 目录无法列出时逐个检查
+            existing.update(path for path in dir_paths if os.path.exists(path))
+            continue
+        existing.update(path for path in dir_paths if os.path.normcase(os.path.basename(path)) in names)
+    
+    return existing
+
+
+def validate_image_path(image_path: Optional[str], existing_paths: Optional[Set[str]] = None) -> Optional[str]:
+    """
+    校验图片路径是否存在且格式受支持
+    
+    Args:
+        image_path: 图片路径
+        existing_paths: 已由 find_existing_paths 批量检查过的存在路径，提供时不再单独检查文件
+        
+    Returns:
+        Optional[str]: 校验通过时返回原路径，否则返回None
+    """
+    if not image_path:
+        return None
+    
+    exists = image_path in existing_paths if existing_paths is not None else os.path.exists(image_path)
+    if not exists:
+        logger.warning("图片路径不存在: %s", image_path)
+        return None
+    
+    _, ext = os.path.splitext(image_path)
+    if ext.lower() not in _IMAGE_FORMATS:
+        logger.warning("不支持的图片格式: %s，支持的格式为: %s", ext, IMAGE_CONFIG['formats'])
+        return None
+    
+    return image_path
+
+
+def analyze_image(image_path: str, analysis_type: str, existing_paths: Optional[Set[str]] = None) -> str:
     """
     分析图片获取特定信息
     
     Args:
         image_path: 图片路径
         analysis_type: 分析类型 (closure_type, shoe_toe_style, heel_shape， heel_height， opening_depth等)
+        existing_paths: 已由 find_existing_paths 批量检查过的存在路径，提供时不再单独检查文件
         
     Returns:
         str: 分析结果
     """
-    if not image_path or not os.path.exists(image_path):
-        logger.warning(f"图片路径不存在: {image_path}")
+    if not validate_image_path(image_path, existing_paths):
         return ""
         
     try:
-        # 检查文件扩展名
-        _, ext = os.path.splitext(image_path)
-        if ext.lower() not in IMAGE_CONFIG["formats"]:
-            logger.warning(f"不支持的图片格式: {ext}")
-            return ""
-        
         # 根据分析类型构建提示词
-        prompts = {
-            "closure_type": "这双鞋的闭合方式是什么（如系带、拉链、一脚蹬、魔术贴等)？请只回答闭合方式，不要有其他内容。",
-            "shoe_toe_style": "这双鞋的鞋头款式是什么（如圆头、尖头、方头、鱼嘴、杏头等）？请只回答鞋头款式，不要有其他内容。",
-            "heel_shape": "这双鞋的鞋跟款式是什么（如平跟、圆跟、方跟、尖跟、马蹄跟、坡跟、松糕跟、防水台等）？请只回答鞋跟款式，不要有其他内容。",
-            "heel_height": "这双鞋的鞋跟高度是多少（如低跟，平跟、中跟，高跟，超高跟等）？请只回答鞋跟高度，不要有其他内容。",
-            "opening_depth": "这双鞋的开口深度是多少（如浅口，中口，深口）？请只回答开口深度，不要有其他内容",
-            "style": "这双鞋的风格是什么（如少女风，田园风，民族风，休闲风，极简风，嘻哈风，洛丽塔风，公主风，舒适，性感风等）？请只回答风格，不要有其他内容。",
-            "shoe_shape": "这双鞋的款式是什么（如布鞋,单鞋,乐福鞋,豆豆鞋,穆勒鞋,牛津鞋,时尚休闲鞋,松糕鞋,摇摇鞋,休闲板鞋,帆布鞋,高帮鞋,方根高跟鞋,坡跟鞋,细跟高跟鞋,洞洞鞋,时尚休闲沙滩鞋,时装凉鞋,时尚雪地靴,雨鞋,包头拖,人字拖,一字拖, 弹力靴,袜靴,短靴,马丁靴,切尔西靴,时装靴等）？请只回答款式，不要有其他内容。"
-        }
-        
-        prompt = prompts.get(analysis_type, "描述这张图片的主要特征，请简洁回答。")
+        prompt = _IMAGE_ANALYSIS_PROMPTS.get(analysis_type, _DEFAULT_IMAGE_ANALYSIS_PROMPT)
         
         # 使用智谱AI视觉模型分析图片
         result = analyze_image_with_openai(image_path, prompt)
-        logger.info(f"图片分析结果 ({analysis_type}): {result}")
+        logger.info("图片分析结果 (%s): %s", analysis_type, result)
+        return result
+    except Exception as e:
+        logger.error("图片分析失败: %s", e)
+        return ""
+
+
+def _multi_analysis_prompt(analysis_types: List[str]) -> str:
+    """构建合并多项图片分析的提示词"""
+    questions = "\n".join(
+        f"[{analysis_type}] {_IMAGE_ANALYSIS_PROMPTS[analysis_type]}"
+        for analysis_type in analysis_types
+        if analysis_type in _IMAGE_ANALYSIS_PROMPTS
+    )
+    return _IMAGE_MULTI_ANALYSIS_PROMPT + questions
+
+
+def _parse_multi_analysis(response: str, analysis_types: List[str]) -> Dict[str, str]:
+    """从合并分析的响应中解析出各分析类型的结果，缺失或为空的类型不包含在结果中"""
+    results = {}
+    # 兼容模型用 ```json 代码块包裹返回内容的情况
+    start, end = response.find("{"), response.rfind("}")
+    if start != -1 and end > start:
+        parsed = json.loads(response[start:end + 1])
+        for analysis_type in analysis_types:
+            value = parsed.get(analysis_type)
+            if isinstance(value, str) and value.strip():
+                results[analysis_type] = value.strip()
+    return results
+
+
+async def _arequest_image_analysis(image_path: str, 
+                                   analysis_type: str, 
+                                   client=None, 
+                                   image_base64: Optional[str] = None) -> str:
+    """请求视觉模型完成一项分析，调用方已校验图片路径"""
+    try:
+        prompt = _IMAGE_ANALYSIS_PROMPTS.get(analysis_type, _DEFAULT_IMAGE_ANALYSIS_PROMPT)
+        result = await aanalyze_image_with_openai(image_path, prompt, client=client, image_base64=image_base64)
+        logger.info("图片分析结果 (%s): %s", analysis_type, result)
         return result
     except Exception as e:
-        logger.error(f"图片分析失败: {e}")
+        logger.error("图片分析失败: %s", e)
+        return ""
+
+
+async def _aencode_image(image_path: str) -> Optional[str]:
+    """在线程中编码图片，图片读取和缩放不阻塞事件循环中的其他请求"""
+    return await asyncio.to_thread(encode_image_to_base64, image_path)
+
+
+async def analyze_image_batch(image_path: str, 
+                              analysis_types: List[str], 
+                              client=None, 
+                              semaphore: Optional[asyncio.Semaphore] = None, 
+                              image_base64: Optional[str] = None) -> Dict[str, str]:
+    """
+    并发完成同一图片的多项分析，每项分析单独请求，图片只校验和编码一次
+    
+    Args:
+        image_path: 图片路径
+        analysis_types: 分析类型列表
+        client: 共用的异步HTTP客户端，不提供时为本批请求创建一个
+        semaphore: 限制同时进行的请求数，不提供时使用配置中的并发数
+        image_base64: 已编码的图片，提供时表示调用方已校验过图片路径
+        
+    Returns:
+        Dict[str, str]: 分析类型到分析结果的字典
+    """
+    if client is None:
+        async with create_async_client() as client:
+            return await analyze_image_batch(image_path, analysis_types, client, semaphore, image_base64)
+    
+    if image_base64 is None:
+        if validate_image_path(image_path):
+            image_base64 = await _aencode_image(image_path)
+        if not image_base64:
+            return {analysis_type: "" for analysis_type in analysis_types}
+    
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(IMAGE_CONFIG["concurrency"])
+    
+    async def analyze(analysis_type: str) -> str:
+        async with semaphore:
+            return await _arequest_image_analysis(image_path, analysis_type, client, image_base64)
+    
+    results = await asyncio.gather(*(analyze(analysis_type) for analysis_type in analysis_types))
+    return dict(zip(analysis_types, results))
+
+
+async def aanalyze_image_multi(image_path: str, 
+                               analysis_types: List[str], 
+                               client, 
+                               semaphore: asyncio.Semaphore, 
+                               existing_paths: Optional[Set[str]] = None) -> Dict[str, str]:
+    """
+    一次视觉模型请求完成同一图片的多项分析，合并请求未能给出的类型并发补充分析，所有请求共用一次图片编码
+    
+    Args:
+        image_path: 图片路径
+        analysis_types: 分析类型列表
+        client: 共用的异步HTTP客户端
+        semaphore: 限制同时进行的请求数
+        existing_paths: 已由 find_existing_paths 批量检查过的存在路径，提供时不再单独检查文件
+        
+    Returns:
+        Dict[str, str]: 分析类型到分析结果的字典
+    """
+    image_base64 = await _aencode_image(image_path) if validate_image_path(image_path, existing_paths) else None
+    if not image_base64:
+        return {analysis_type: "" for analysis_type in analysis_types}
+    
+    if len(analysis_types) < 2:
+        return await analyze_image_batch(image_path, analysis_types, client, semaphore, image_base64)
+    
+    results = {}
+    try:
+        async with semaphore:
+            response = await aanalyze_image_with_openai(
+                image_path,
+                _multi_analysis_prompt(analysis_types),
+                max_tokens=IMAGE_CONFIG["multi_max_tokens"],
+                client=client,
+                image_base64=image_base64
+            )
+        results = _parse_multi_analysis(response, analysis_types)
+        logger.info("图片合并分析结果: %s", results)
+    except Exception as e:
+        logger.error("图片合并分析失败: %s", e)
+    
+    missing = [analysis_type for analysis_type in analysis_types if analysis_type not in results]
+    if missing:
+        results.update(await analyze_image_batch(image_path, missing, client, semaphore, image_base64))
+    return results
+
+
+def analyze_images(types_by_image: Dict[str, List[str]], 
+                   existing_paths: Optional[Set[str]] = None) -> Dict[Tuple[str, str], str]:
+    """
+    并发完成多张图片的分析：同一图片需要多项分析时合并为一次请求，所有请求共用连接池和并发上限
+    
+    Args:
+        types_by_image: 图片路径到分析类型列表的字典
+        existing_paths: 已由 find_existing_paths 批量检查过的存在路径，提供时不再单独检查文件
+        
+    Returns:
+        Dict[Tuple[str, str], str]: (图片路径, 分析类型) 到分析结果的字典
+    """
+    async def run() -> List[Dict[str, str]]:
+        semaphore = asyncio.Semaphore(IMAGE_CONFIG["concurrency"])
+        async with create_async_client() as client:
+            return await asyncio.gather(*(
+                aanalyze_image_multi(image_path, analysis_types, client, semaphore, existing_paths)
+                for image_path, analysis_types in types_by_image.items()
+            ))
+    
+    if not types_by_image:
+        return {}
+    
+    analyses = {}
+    for image_path, results in zip(types_by_image, asyncio.run(run())):
+        for analysis_type, result in results.items():
+            analyses[(image_path, analysis_type)] = result
+    return analyses
+
+
+@functools.lru_cache(maxsize=256)
+def _available_value_index(available_values: Tuple[str, ...]) -> Tuple[frozenset, Dict[str, str]]:
+    """
+    为一组可选值构建查找索引，批量处理中相同的可选值列表只构建一次
+    
+    Returns:
+        Tuple: (可选值集合, 忽略大小写和首尾空白后的可选值到第一个对应原值的字典)
+    """
+    normalized_values = {value.strip().lower(): value for value in reversed(available_values)}
+    return frozenset(available_values), normalized_values
+
+
+def _lexical_value_match(query_value: str, available_values: List[str], attribute_type: str = None) -> Optional[str]:
+    """
+    不调用模型的匹配：可选值不超过一个、命中预定义的值映射或与可选值完全一致
+    
+    Returns:
+        Optional[str]: 匹配结果，需要语义匹配时返回None
+    """
+    if not available_values:
         return ""
+        
+    if len(available_values) == 1:
+        return available_values[0]
+    
+    available_set, normalized_values = _available_value_index(tuple(available_values))
+    
+    # 检查预定义的值映射：一次匹配找出查询值中出现了别名的全部标准值（完全相等也是出现），按映射顺序取第一个可选的标准值
+    if attribute_type in _VALUE_PATTERNS:
+        pattern, standard_values = _VALUE_PATTERNS[attribute_type]
+        found = pattern.match(query_value)
+        for group, standard_value in standard_values:
+            if found.group(group) is not None and standard_value in available_set:
+                return standard_value
+    
+    # 查询值与可选值完全一致（忽略大小写和首尾空白）时直接返回，无需调用LLM
+    if query_value:
+        exact_match = normalized_values.get(query_value.strip().lower())
+        if exact_match is not None:
+            return exact_match
+    
+    return None
+
+
+def _llm_value_match(query_value: str, available_values: List[str]) -> str:
+    """使用LLM进行语义匹配，返回模型的原始回答"""
+    # 可选值排序后放在末尾，相同的可选值集合无论传入顺序如何都生成相同的提示词
+    prompt = _VALUE_MATCH_PROMPT.format(options=','.join(sorted(available_values)), query=query_value)
+    matched_value = cached_llm(prompt, ttl=CACHE_CONFIG["llm_response_ttl"])
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("可选值: %s", ', '.join(available_values))
+    logger.info("查询值: %s", query_value)
+    logger.info("语义匹配结果: %s", matched_value)
+    return matched_value
 
 
 def find_best_value_match(query_value: str, available_values: List[str], attribute_type: str = None) -> str:
@@ -92,45 +492,35 @@ def find_best_value_match(query_value: str, available_values: List[str], attribu
     Returns:
         str: 最匹配的值
     """
-    if not available_values:
-        return ""
+    lexical_match = _lexical_value_match(query_value, available_values, attribute_type)
+    if lexical_match is not None:
+        return lexical_match
+    
+    return _semantic_value_match(query_value, available_values, _embedding_matches([query_value], available_values)[0])
+
+
+def _semantic_value_match(query_value: str, available_values: List[str], embedding_match: Tuple[str, float]) -> str:
+    """
+    语义匹配：嵌入相似度足够高时直接采用最相似的可选值，否则调用LLM
+    
+    Args:
+        query_value: 查询值
+        available_values: 可用值列表
+        embedding_match: 最相似的可选值及其相似度
         
-    if len(available_values) == 1:
-        return available_values[0]
+    Returns:
+        str: 最匹配的值，匹配失败时返回空字符串
+    """
+    embedding_value, score = embedding_match
+    # 数字查询值需要按提示词中的鞋跟高度区间换算，嵌入相似度无法判断，始终交给LLM
+    if score >= _EMBEDDING_MATCH_THRESHOLD and not any(char.isdigit() for char in query_value):
+        logger.info("嵌入匹配结果: %s -> %s (%.3f)", query_value, embedding_value, score)
+        return embedding_value
     
-    # 检查预定义的值映射
-    if attribute_type and attribute_type in ATTRIBUTE_MATCHING["value_mapping"]:
-        value_map = ATTRIBUTE_MATCHING["value_mapping"][attribute_type]
-        for standard_value, aliases in value_map.items():
-            if query_value in aliases and standard_value in available_values:
-                return standard_value
-            # 检查部分匹配
-            for alias in aliases:
-                if alias in query_value and standard_value in available_values:
-                    return standard_value
-    # 使用LLM进行语义匹配
-    prompt = f"""
-    给出以下可选值:{','.join(available_values)},找出与{query_value}语义匹配相近或者与{query_value}值相等的选项;
-    如果{query_value}是数字，请直接返回与{query_value}匹配的以下鞋跟高度选项:低跟1-3cm,中跟3cm-5cm,高跟6cm-8cm,超高跟8cm以上,平跟小于1cm;
-    请直接返回最匹配的选项，不要返回其他多余内容。
-    """
-    matched_value = call_llm(prompt)
-    logger.info(f"可选值: {', '.join(available_values)}")
-    logger.info(f"查询值: {query_value}")
-    logger.info(f"语义匹配结果: {matched_value}")
-    # 如果matched_value有多个值，调用模型重新进行语义匹配
+    matched_value = _llm_value_match(query_value, available_values)
+    # 如果matched_value有多个值，使用与查询值最相似的可选值
     if "," in matched_value:
-        # 输入词汇
-        input_word = query_value
-        candidate_words = available_values
-        # 生成嵌入
-        input_embedding = model.encode(input_word, convert_to_tensor=True)
-        candidate_embeddings = model.encode(candidate_words, convert_to_tensor=True)
-        # 计算余弦相似度
-        similarities = util.cos_sim(input_embedding, candidate_embeddings)[0]
-        # 找到最相似的词汇
-        max_index = similarities.argmax()
-        matched_value = candidate_words[max_index]
+        matched_value = embedding_value
     
     if matched_value in available_values:
         return matched_value
@@ -139,72 +529,146 @@ def find_best_value_match(query_value: str, available_values: List[str], attribu
         return ""
 
 
-def get_current_season() -> str:
-    """获取当前季节"""
-    month = datetime.datetime.now().month
-    if 3 <= month <= 5:
-        return "春季"
-    elif 6 <= month <= 8:
-        return "夏季"
-    elif 9 <= month <= 11:
-        return "秋季"
-    else:
-        return "冬季"
+def find_best_value_match_batch(items: List[Tuple[str, List[str], Optional[str]]]) -> List[str]:
+    """
+    批量版本的 find_best_value_match，需要语义匹配的查询值按可选值列表分组后一次编码
+    
+    Args:
+        items: (查询值, 可用值列表, 属性类型) 列表
+        
+    Returns:
+        List[str]: 与输入顺序对应的最匹配的值
+    """
+    results = [""] * len(items)
+    # 可选值列表到需要语义匹配的下标
+    semantic_groups = {}
+    
+    for index, (query_value, available_values, attribute_type) in enumerate(items):
+        lexical_match = _lexical_value_match(query_value, available_values, attribute_type)
+        if lexical_match is not None:
+            results[index] = lexical_match
+        else:
+            semantic_groups.setdefault(tuple(available_values), []).append(index)
+    
+    for candidates, indexes in semantic_groups.items():
+        available_values = list(candidates)
+        matches = _embedding_matches([items[index][0] for index in indexes], available_values)
+        for index, embedding_match in zip(indexes, matches):
+            results[index] = _semantic_value_match(items[index][0], available_values, embedding_match)
+    
+    return results
 
 
-def get_next_season() -> str:
-    """获取下一个季节"""
-    current_season = get_current_season()
-    season_map = {
-        "春季": "夏季",
-        "夏季": "秋季",
-        "秋季": "冬季",
-        "冬季": "春季"
-    }
-    return season_map.get(current_season, "春季")
+@functools.lru_cache(maxsize=1)
+def _st_model():
+    """
+    加载文本嵌入模型，首次需要语义匹配时才导入和加载，只导入本模块的进程不占用模型内存
+    
+    Returns:
+        SentenceTransformer: 推理模式的嵌入模型
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    
+    if EMBEDDING_CONFIG["num_threads"]:
+        # 多个请求并发编码时限制每次推理的线程数，避免线程数超过CPU核数
+        torch.set_num_threads(EMBEDDING_CONFIG["num_threads"])
+    
+    model = SentenceTransformer(EMBEDDING_CONFIG["model_name"])
+    model.eval()
+    if EMBEDDING_CONFIG["quantize"] and model.device.type == "cpu":
+        # 线性层动态量化为int8，CPU上的编码速度约提升一倍
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
 
 
-def extract_primary_material(material_str: str) -> str:
+@functools.lru_cache(maxsize=256)
+def _encode_candidates(candidates: Tuple[str, ...]):
     """
-    从材质字符串中提取主要材质
-    例如："牛皮革+织物" -> "牛皮革"
+    编码候选值并归一化，同一组候选值在进程内只编码一次
     
     Args:
-        material_str: 材质字符串
+        candidates: 候选值元组
         
     Returns:
-        str: 主要材质
+        Tensor: 归一化后的候选值嵌入，每行对应一个候选值
     """
-    if not material_str:
-        return ""
-        
-    # 处理常见的分隔符
-    for sep in ["+", "，", ",", "、", "/"]:
-        if sep in material_str:
-            return material_str.split(sep)[0].strip()
+    import torch
     
-    return material_str.strip()
+    with torch.inference_mode():
+        return _st_model().encode(list(candidates), convert_to_tensor=True, normalize_embeddings=True)
 
 
-def clean_attribute_value(value: str) -> str:
+def _embedding_matches(query_values: List[str], available_values: List[str]) -> List[Tuple[str, float]]:
+    """
+    按嵌入的余弦相似度为每个查询值找出最相似的可选值，所有查询值一次批量编码
+    
+    嵌入已归一化，相似度矩阵即为查询嵌入与候选嵌入的矩阵乘积
+    
+    Returns:
+        List[Tuple[str, float]]: 与查询值顺序对应的 (最相似的可选值, 相似度)
     """
-    清理属性值字符串
+    import torch
+    
+    candidate_embeddings = _encode_candidates(tuple(available_values))
+    with torch.inference_mode():
+        query_embeddings = _st_model().encode(query_values, batch_size=64, convert_to_tensor=True, normalize_embeddings=True)
+        similarities = query_embeddings @ candidate_embeddings.T
+        scores, indexes = similarities.max(dim=1)
+    return [
+        (available_values[int(index)], float(score))
+        for index, score in zip(indexes, scores)
+    ]
+
+
+def find_value_containing(values: List[str], needles: List[str]) -> Optional[str]:
+    """
+    找出第一个同时包含所有关键词的值，所有值拼接后由正则引擎一次扫描完成
     
     Args:
-        value: 属性值字符串
+        values: 待查找的值列表
+        needles: 关键词列表
         
     Returns:
-        str: 清理后的字符串
+        Optional[str]: 第一个包含所有关键词的值，找不到时返回None
     """
-    if not value:
-        return ""
-        
-    # 移除常见的干扰词和格式
-    value = value.replace("材质：", "").strip()
-    value = value.replace("主要成分：", "").replace("类型：", "").strip()
+    if not values:
+        return None
     
-    # 移除额外的标点符号
-    for char in ["。", "！", "？", "；", "：", "、", "（", "）", "(", ")", "\"", "'"]:
-        value = value.replace(char, "")
-        
-    return value.strip() 
\ No newline at end of file
+    # 以\x00分隔各个值，每个关键词对应一个只在当前值内查找的前瞻
+    lookaheads = "".join(f"(?=[^\x00]*{re.escape(needle)})" for needle in needles)
+    match = re.search(f"(?:^|(?<=\x00)){lookaheads}([^\x00]*)", "\x00".join(values))
+    return match.group(1) if match else None
+
+
+# 每个季节的下一个季节
+_NEXT_SEASON = {
+    "春季": "夏季",
+    "夏季": "秋季",
+    "秋季": "冬季",
+    "冬季": "春季"
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _season_for(date: datetime.date) -> str:
+    """获取日期所在的季节，同一天内的调用直接返回缓存结果"""
+    month = date.month
+    if 3 <= month <= 5:
+        return "春季"
+    elif 6 <= month <= 8:
+        return "夏季"
+    elif 9 <= month <= 11:
+        return "秋季"
+    else:
+        return "冬季"
+
+
+def get_current_season() -> str:
+    """获取当前季节"""
+    return _season_for(datetime.date.today())
+
+
+def get_next_season() -> str:
+    """获取下一个季节"""
+    return _NEXT_SEASON.get(get_current_season(), "春季")